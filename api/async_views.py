@@ -0,0 +1,150 @@
+"""Async variants of the list and upload endpoints, for ASGI servers.
+
+Under ``core/asgi.py`` these run on the event loop: list queries use the
+async ORM, and the upload is imported in the request's own worker thread,
+so slow clients and long imports do not hold up other requests.
+"""
+import logging
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import ValidationError
+from .filters import filter_employees, requested_fields, select_fields
+from .jobs import queue_import
+from .ledger import replayed_result
+from .models import Company, Employee
+from .pagination import EmployeeCursorPagination
+from .serializers import CompanySerializer, EmployeeSerializer, FileUploadSerializer
+from .versions import TABLES, acached_payload, data_etag
+
+logger = logging.getLogger(__name__)
+
+
+@require_GET
+async def company_list(request):
+    """List every company, like ``GET /api/companies/``."""
+    async def build():
+        companies = [company async for company in Company.objects.order_by('id').aiterator()]
+        return CompanySerializer(companies, many=True).data
+
+    return await _cached_response(request, ['companies'], build)
+
+
+@require_GET
+async def employee_list(request):
+    """List a page of employees ordered by id.
+
+    Takes the filters and ``fields`` of ``GET /api/employees/``. Pages are
+    linked through ``after``, the last id of the previous page, and
+    ``count=1`` adds the number of matching employees.
+    """
+    try:
+        fields = requested_fields(request.GET, EmployeeSerializer().fields)
+        employees = filter_employees(Employee.objects.all(), request.GET)
+        after = _integer(request.GET, 'after', 0)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+    page_size = _page_size(request.GET)
+
+    async def build():
+        # One row more than the page shows whether there is a next page
+        queryset = select_fields(employees.filter(id__gt=after).order_by('id'), fields)
+        page = [employee async for employee in queryset[:page_size + 1].aiterator()]
+        data = {'next': None, 'results': EmployeeSerializer(page[:page_size], many=True, fields=fields).data}
+        if len(page) > page_size:
+            params = request.GET.copy()
+            params['after'] = page[page_size - 1].id
+            data['next'] = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+        if request.GET.get('count', '').lower() in ('1', 'true', 'yes', 'on'):
+            data['count'] = await employees.acount()
+        return data
+
+    return await _cached_response(request, TABLES, build)
+
+
+@csrf_exempt
+@require_POST
+async def upload(request):
+    """Import uploaded files, like ``POST /api/upload/``.
+
+    The ASGI server spools the request body to a temporary file as it
+    arrives; parsing it into uploads and importing or queueing them runs in
+    the request's worker thread, off the event loop.
+    """
+    def run():
+        data = request.POST.copy()
+        data.update(request.FILES)
+        flags = {
+            name: request.GET.get(name, '').lower() in ('1', 'true', 'yes', 'on')
+            for name in ['profile', 'force', 'async']
+        }
+        serializer = FileUploadSerializer(
+            data=data, context={'profile': flags['profile'], 'force': flags['force'], 'request': request}
+        )
+        if not serializer.is_valid():
+            return JsonResponse({"validation_error": serializer.errors}, status=400)
+        if flags['async']:
+            entry = None if flags['force'] else serializer.earlier_import(serializer.validated_data)
+            if entry is not None:
+                return JsonResponse(replayed_result(entry))
+            job = queue_import(serializer.validated_data, force=flags['force'])
+            return JsonResponse(
+                {
+                    "job_id": job.id,
+                    "status": job.status,
+                    "status_url": request.build_absolute_uri(reverse('imports-detail', args=[job.id]))
+                },
+                status=202
+            )
+        result = serializer.create(serializer.validated_data)
+        return JsonResponse(result, status=200 if 'ledger' in result else 201)
+
+    try:
+        return await sync_to_async(run)()
+    except ValidationError as e:
+        # Raised while reading the file, e.g. for missing columns
+        return JsonResponse({"validation_error": e.detail}, status=400)
+    except Exception as e:
+        logger.error(f"Unexpected error in file upload: {e}")
+        return JsonResponse(
+            {"error": "An unexpected error occurred while processing your request"},
+            status=500
+        )
+
+
+async def _cached_response(request, tables, build):
+    """Async version of the ETag and response cache handling of the REST framework views."""
+    etag = await sync_to_async(data_etag)(request, tables)
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in etags or '*' in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(await acached_payload(etag, build), safe=False)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _integer(params, name, default):
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "Expected an integer."})
+
+
+def _page_size(params):
+    """Return ?page_size= within the limits of the employee pagination, like REST framework."""
+    try:
+        page_size = int(params.get('page_size', ''))
+    except ValueError:
+        return EmployeeCursorPagination.page_size
+    if page_size <= 0:
+        return EmployeeCursorPagination.page_size
+    return min(page_size, EmployeeCursorPagination.max_page_size)
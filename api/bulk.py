@@ -0,0 +1,94 @@
+import itertools
+import json
+import logging
+from decimal import Decimal
+import pandas as pd
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+
+class RecordError(ValueError):
+    """The request body is not valid JSON or NDJSON."""
+
+
+def iter_records(stream, content_type):
+    """Yield the records of a JSON array or NDJSON request body as it is read.
+
+    Numbers with a fraction are parsed as Decimal, so salaries stay exact.
+    A JSON array is parsed incrementally with ijson when it is installed,
+    and read whole otherwise. Raises RecordError on malformed input, after
+    the records before it were yielded.
+    """
+    if content_type.split(';')[0].strip().lower() in NDJSON_CONTENT_TYPES:
+        yield from _ndjson_records(stream)
+    elif ijson is not None:
+        try:
+            yield from ijson.items(stream, 'item')
+        except ijson.JSONError as e:
+            # Keep the message, not the text of the body ijson adds below it
+            raise RecordError(f"Invalid JSON: {str(e).splitlines()[0]}")
+    else:
+        try:
+            records = json.load(stream, parse_float=Decimal)
+        except ValueError as e:
+            raise RecordError(f"Invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise RecordError("Expected a JSON array of records")
+        yield from records
+
+
+def _ndjson_records(stream):
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line, parse_float=Decimal)
+        except ValueError as e:
+            raise RecordError(f"Invalid JSON on line {number}: {e}")
+
+
+def record_frames(records, columns, batch_size):
+    """Group records into dataframes of ``batch_size`` rows with the given columns.
+
+    Keys are matched to the columns case-insensitively; missing ones are
+    empty. The index counts records from -1, so ``index + 2``, the row number
+    errors report, is the 1-based position of the record in the body.
+    Yields (dataframe, errors), where errors are for records that are not
+    JSON objects. When reading the records fails, the records read before
+    the error are yielded before the RecordError is raised.
+    """
+    start = -1
+    records = iter(records)
+    while True:
+        batch = []
+        error = None
+        try:
+            for record in itertools.islice(records, batch_size):
+                batch.append(record)
+        except RecordError as e:
+            error = e
+        if not batch and error is None:
+            return
+        rows = []
+        errors = []
+        for position, record in enumerate(batch, start=start + 2):
+            if isinstance(record, dict):
+                rows.append({key.upper(): value for key, value in record.items()})
+            else:
+                errors.append({"row": position, "error": "Record is not a JSON object"})
+                rows.append({})
+        df = pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(start, start + len(rows)))
+        # Records that are not objects were reported already
+        rejected = [item['row'] - 2 for item in errors]
+        if rows:
+            yield df.drop(index=rejected), errors
+        if error is not None:
+            raise error
+        start += len(batch)
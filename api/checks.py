@@ -0,0 +1,61 @@
+import os
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Cache backends every server process keeps to itself
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs=None, import_worker=False, **kwargs):
+    """Refuse a process-local default cache when more than one process serves data.
+
+    The data versions behind ETags live in the default cache. A server
+    worker that did not handle an import, or any server process when
+    run_import_worker handled it, would keep its own version and answer with
+    the old data. The server and worker count are those entrypoint.sh and
+    gunicorn.conf.py export in SERVER and WEB_WORKERS; IMPORT_WORKER=true
+    says run_import_worker runs beside the server, which passes
+    import_worker itself when it starts.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    if import_worker or os.getenv('IMPORT_WORKER', 'false').lower() == 'true':
+        return [Error(
+            f"run_import_worker and the server cannot share the process-local cache {backend}.",
+            hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, e.g. the Redis "
+                 "service of compose.yaml, in the server and the import worker.",
+            id='api.E001',
+        )]
+    server = os.getenv('SERVER', 'runserver')
+    workers = int(os.getenv('WEB_WORKERS') or 1)
+    if server == 'runserver' or workers < 2:
+        return []
+    return [Error(
+        f"{workers} {server} workers cannot share the process-local cache {backend}.",
+        hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, e.g. the Redis "
+             "service of compose.yaml, or run a single worker with WEB_WORKERS=1.",
+        id='api.E001',
+    )]
+
+
+@register(Tags.database)
+def check_asgi_connections(app_configs=None, **kwargs):
+    """Warn about persistent database connections under uvicorn.
+
+    ASGI requests run their queries in sync_to_async threads that change
+    from request to request, so each thread keeps a connection open until
+    CONN_MAX_AGE expires; a connection pool (DB_POOL) reuses them instead.
+    """
+    if os.getenv('SERVER') != 'uvicorn':
+        return []
+    return [
+        Warning(
+            f"Database {alias} keeps connections for {database['CONN_MAX_AGE']} seconds under uvicorn.",
+            hint="Set DB_CONN_MAX_AGE=0, or DB_POOL=true to reuse connections through a pool.",
+            id='api.W001',
+        )
+        for alias, database in settings.DATABASES.items()
+        if database.get('CONN_MAX_AGE')
+    ]
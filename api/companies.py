@@ -0,0 +1,170 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from .models import Company
+
+VERSION_KEY = 'company-ids:version'
+
+
+class CompanyIdCache:
+    """Map company names to ids, least recently used names dropped first.
+
+    Entries live in process memory and, when ``alias`` names a Django cache,
+    in that cache too, so other processes can reuse them. Any Company write
+    clears the cache: a version number kept in the shared cache is bumped,
+    which makes every process drop its own entries on its next lookup.
+    """
+
+    def __init__(self, max_size, alias=None):
+        self.max_size = max_size
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def get_many(self, names):
+        """Return the cached ids of ``names``."""
+        version = self._shared_version()
+        found = {}
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            for name in names:
+                if name in self._entries:
+                    self._entries.move_to_end(name)
+                    found[name] = self._entries[name]
+
+        missing = [name for name in names if name not in found]
+        if self.shared is not None and missing:
+            keys = {self._key(name, version): name for name in missing}
+            shared = {keys[key]: pk for key, pk in self.shared.get_many(list(keys)).items()}
+            self._store(shared, version)
+            found.update(shared)
+        return found
+
+    def set_many(self, ids):
+        """Cache a name to id mapping of committed companies."""
+        version = self._shared_version()
+        self._store(ids, version)
+        if self.shared is not None:
+            self.shared.set_many({self._key(name, version): pk for name, pk in ids.items()}, timeout=None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            try:
+                self.shared.incr(VERSION_KEY)
+            except ValueError:
+                self.shared.add(VERSION_KEY, 1, timeout=None)
+
+    def _store(self, ids, version):
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries.update(ids)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _shared_version(self):
+        return self.shared.get(VERSION_KEY, 0) if self.shared is not None else 0
+
+    def _key(self, name, version):
+        digest = hashlib.sha1(name.encode()).hexdigest()
+        return f"company-ids:{version}:{digest}"
+
+
+company_ids = CompanyIdCache(settings.COMPANY_CACHE_SIZE, settings.COMPANY_CACHE_ALIAS)
+
+
+def resolve_companies(names):
+    """Return the ids of the companies called ``names``, creating missing ones.
+
+    Cached names cost one primary key lookup, which drops entries of
+    companies deleted or renamed by a process whose changes did not reach
+    this cache. The rest are resolved in a single statement on PostgreSQL
+    and in two elsewhere. Returns the name to id mapping and the number of
+    companies created. New entries are cached once the transaction commits,
+    so rolled back companies are never cached.
+    """
+    ids = company_ids.get_many(names)
+    if ids:
+        stored = dict(Company.objects.filter(pk__in=ids.values()).values_list('id', 'name'))
+        stale = [name for name, pk in ids.items() if stored.get(pk) != name]
+        if stale:
+            company_ids.clear()
+            for name in stale:
+                del ids[name]
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids, 0
+
+    try:
+        with transaction.atomic():
+            resolved, created = _resolve(missing)
+    except IntegrityError:
+        # Another transaction created one of the companies first, or a
+        # cached id turned out to be gone; drop the cache and look again
+        company_ids.clear()
+        with transaction.atomic():
+            resolved, created = _resolve(missing)
+
+    transaction.on_commit(lambda: company_ids.set_many(resolved))
+    ids.update(resolved)
+    return ids, created
+
+
+def _resolve(names):
+    if connection.vendor == 'postgresql':
+        return _insert_returning(names)
+    return _get_or_create(names)
+
+
+def _insert_returning(names):
+    table = connection.ops.quote_name(Company._meta.db_table)
+    with connection.cursor() as cursor:
+        # The SELECT reads the snapshot taken before the INSERT, so it only
+        # returns companies that already existed
+        cursor.execute(
+            f"WITH names (name) AS (SELECT unnest(%s::text[])), "
+            f"inserted AS ("
+            f"INSERT INTO {table} (name, created_at, updated_at) "
+            f"SELECT name, now(), now() FROM names "
+            f"ON CONFLICT (name) DO NOTHING RETURNING name, id"
+            f") "
+            f"SELECT name, id, true FROM inserted "
+            f"UNION ALL "
+            f"SELECT name, id, false FROM {table} WHERE name IN (SELECT name FROM names)",
+            [names]
+        )
+        rows = cursor.fetchall()
+
+    ids = {name: pk for name, pk, _ in rows}
+    created = sum(1 for _, _, inserted in rows if inserted)
+    # Companies committed by a concurrent import after the snapshot
+    late = [name for name in names if name not in ids]
+    if late:
+        ids.update(Company.objects.filter(name__in=late).values_list('name', 'id'))
+    return ids, created
+
+
+def _get_or_create(names):
+    ids = dict(Company.objects.filter(name__in=names).values_list('name', 'id'))
+    new_companies = [Company(name=name) for name in names if name not in ids]
+    if new_companies:
+        Company.objects.bulk_create(new_companies)
+        if connection.features.can_return_rows_from_bulk_insert:
+            ids.update((company.name, company.pk) for company in new_companies)
+        else:
+            ids.update(Company.objects.filter(
+                name__in=[company.name for company in new_companies]
+            ).values_list('name', 'id'))
+    return ids, len(new_companies)
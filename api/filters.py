@@ -0,0 +1,91 @@
+from decimal import Decimal, InvalidOperation
+from rest_framework.exceptions import ValidationError
+
+# Fields employees can be ordered by with ?ordering=, '-' in front for descending
+ORDERING_FIELDS = [
+    'id', 'employee_id', 'first_name', 'last_name', 'salary',
+    'department_id', 'manager_id', 'created_at', 'updated_at'
+]
+
+
+def filter_employees(queryset, params):
+    """Apply the employee filters given in the query string ``params``.
+
+    Every filter is on an indexed column: the company name or id, department
+    and manager ids (comma separated for several), and a salary range.
+    """
+    filters = {}
+    if params.get('company'):
+        filters['company__name'] = params['company']
+    if params.get('company_id'):
+        filters['company_id__in'] = _integers(params, 'company_id')
+    for name in ['department_id', 'manager_id']:
+        if params.get(name):
+            filters[f'{name}__in'] = _integers(params, name)
+    if params.get('salary_min'):
+        filters['salary__gte'] = _decimal(params, 'salary_min')
+    if params.get('salary_max'):
+        filters['salary__lte'] = _decimal(params, 'salary_max')
+    return queryset.filter(**filters)
+
+
+def requested_fields(params, allowed):
+    """Return the fields named in ?fields=, or None to return every field."""
+    value = params.get('fields')
+    if not value:
+        return None
+
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+    return fields
+
+
+def select_fields(queryset, fields):
+    """Fetch only the requested columns, and the company name in the same query."""
+    if fields is None:
+        return queryset.select_related('company')
+    columns = ['company__name' if name == 'company' else name for name in fields]
+    queryset = queryset.only(*columns)
+    if 'company' in fields:
+        queryset = queryset.select_related('company')
+    return queryset
+
+
+def employee_ordering(params):
+    """Return the order_by() fields for ?ordering=, with id breaking ties."""
+    value = params.get('ordering') or 'id'
+    field = value.removeprefix('-')
+    if field not in ORDERING_FIELDS:
+        raise ValidationError({
+            "ordering": f"Unknown field: {field}. Choose from {', '.join(ORDERING_FIELDS)}"
+        })
+    if field == 'id':
+        return (value,)
+    return (value, '-id' if value.startswith('-') else 'id')
+
+
+def report_depth(params):
+    """Return the positive ?depth= of a reports lookup, 1 when it is not given."""
+    value = params.get('depth') or '1'
+    if not value.isdigit() or int(value) < 1:
+        raise ValidationError({"depth": "Expected a positive integer."})
+    return int(value)
+
+
+def _integers(params, name):
+    try:
+        return [int(value) for value in params[name].split(',')]
+    except ValueError:
+        raise ValidationError({name: "Expected an integer or comma separated integers."})
+
+
+def _decimal(params, name):
+    try:
+        value = Decimal(params[name])
+    except InvalidOperation:
+        raise ValidationError({name: "Expected a number."})
+    if not value.is_finite():
+        raise ValidationError({name: "Expected a number."})
+    return value
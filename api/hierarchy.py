@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import connection
+from .models import Employee
+
+# Employee fields holding the materialized reporting hierarchy
+HIERARCHY_FIELDS = ['hierarchy_path', 'hierarchy_depth']
+
+
+def rebuild_hierarchy(companies):
+    """Recompute the hierarchy path and depth of every employee of ``companies``.
+
+    ``companies`` maps company ids to names. MANAGER_ID refers to the
+    EMPLOYEE_ID of another employee of the same company; an employee managed
+    by itself heads the organisation. Each company is resolved in one pass
+    over its (employee_id, manager_id) pairs and only changed rows are
+    written. Returns a warning for every employee whose manager does not
+    exist, who is then treated as a head, and for every employee in a
+    management cycle, whose path stays unknown along with everyone below.
+    """
+    warnings = []
+    for company_id, name in sorted(companies.items(), key=lambda item: item[1]):
+        rows = Employee.objects.filter(company_id=company_id).values_list(
+            'id', 'employee_id', 'manager_id', *HIERARCHY_FIELDS
+        ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        stored = {}
+        managers = {}
+        for pk, employee_id, manager_id, path, depth in rows:
+            stored[employee_id] = (pk, path, depth)
+            managers[employee_id] = manager_id
+
+        paths, dangling, cycles = hierarchy_paths(managers)
+        for employee_id in sorted(dangling):
+            warnings.append({
+                "company": name,
+                "employee_id": employee_id,
+                "manager_id": managers[employee_id],
+                "warning": "Manager not found"
+            })
+        for cycle in cycles:
+            chain = ' > '.join(map(str, cycle + cycle[:1]))
+            for employee_id in cycle:
+                warnings.append({
+                    "company": name,
+                    "employee_id": employee_id,
+                    "manager_id": managers[employee_id],
+                    "warning": f"Management cycle: {chain}"
+                })
+
+        changes = []
+        for employee_id, (pk, path, depth) in stored.items():
+            hierarchy = paths[employee_id] or (None, None)
+            if hierarchy != (path, depth):
+                changes.append((pk,) + hierarchy)
+        if changes:
+            _save(company_id, changes)
+    return warnings
+
+
+def hierarchy_paths(managers):
+    """Resolve a company's employee id to manager id mapping into paths.
+
+    Returns {employee_id: (path, depth) or None}, the employee ids whose
+    manager is missing and the management cycles, each a list of employee
+    ids. Every employee is visited once: walks up the chain stop at the
+    first employee whose path is already known.
+    """
+    paths = {}
+    dangling = []
+    cycles = []
+    for start in managers:
+        trail = []
+        positions = {}
+        node = start
+        while node not in paths:
+            if node in positions:
+                cycles.append(trail[positions[node]:])
+                break
+            manager = managers[node]
+            if manager == node or manager not in managers:
+                if manager != node:
+                    dangling.append(node)
+                paths[node] = (f"/{node}/", 0)
+                break
+            positions[node] = len(trail)
+            trail.append(node)
+            node = manager
+
+        # Employees on the trail are below ``node``; none are known in a cycle
+        parent = paths.get(node)
+        for employee_id in reversed(trail):
+            if parent is not None:
+                parent = (f"{parent[0]}{employee_id}/", parent[1] + 1)
+            paths[employee_id] = parent
+    return paths, dangling, cycles
+
+
+def _save(company_id, changes):
+    """Write (id, path, depth) tuples of a company's employees, in one statement on PostgreSQL.
+
+    The company is part of the statement so a partitioned table only has
+    its partition locked and scanned.
+    """
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(Employee._meta.db_table)
+        ids, paths, depths = zip(*changes)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET hierarchy_path = changed.path, hierarchy_depth = changed.depth "
+                f"FROM (SELECT unnest(%s::bigint[]) AS id, unnest(%s::text[]) AS path, "
+                f"unnest(%s::integer[]) AS depth) AS changed "
+                f"WHERE {table}.company_id = %s AND {table}.id = changed.id",
+                [list(ids), list(paths), list(depths), company_id]
+            )
+        return
+
+    Employee.objects.bulk_update(
+        [Employee(id=pk, hierarchy_path=path, hierarchy_depth=depth) for pk, path, depth in changes],
+        HIERARCHY_FIELDS,
+        batch_size=settings.IMPORT_BATCH_SIZE
+    )
@@ -0,0 +1,133 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from .models import ImportJob
+from .serializers import FileUploadSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def queue_import(validated_data, force=False):
+    """Store a validated single-file upload under MEDIA_ROOT as a pending import job and return it."""
+    if 'file' not in validated_data or validated_data.get('files'):
+        raise serializers.ValidationError({"file": ["Background imports take a single file."]})
+
+    file = validated_data['file']
+    return ImportJob.objects.create(
+        file=file,
+        file_name=file.name,
+        mode=validated_data['mode'],
+        all_sheets=validated_data['all_sheets'],
+        force=force
+    )
+
+
+def claim_next_job():
+    """Mark the oldest pending import job as running and return it, or None.
+
+    Rows locked by another worker are skipped, so several workers can poll
+    the same queue.
+    """
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImportJob.Status.PENDING)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = ImportJob.Status.RUNNING
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def requeue_stale_jobs(timeout):
+    """Queue running jobs again whose worker has not sent a heartbeat for ``timeout`` seconds.
+
+    Such a worker has died or lost its database connection. Its import ran
+    in one transaction that was rolled back, so the job starts over. Return
+    the number of jobs queued again.
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return (
+        ImportJob.objects.filter(status=ImportJob.Status.RUNNING)
+        # Jobs claimed before heartbeats were recorded have none
+        .filter(Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff))
+        .update(status=ImportJob.Status.PENDING, rows_read=0, rows_validated=0, rows_inserted=0)
+    )
+
+
+def run_job(job):
+    """Run a claimed import job and store its outcome on the job."""
+    progress = ProgressReporter(job.pk)
+    try:
+        with job.file.open('rb') as file:
+            serializer = FileUploadSerializer(context={'progress': progress, 'force': job.force})
+            job.result = serializer.create({'file': file, 'mode': job.mode, 'all_sheets': job.all_sheets})
+        job.status = ImportJob.Status.COMPLETED
+    except serializers.ValidationError as e:
+        job.status = ImportJob.Status.FAILED
+        job.result = {"validation_error": e.detail}
+        job.error = json.dumps(e.detail)
+    except Exception as e:
+        logger.error(f"Import job {job.pk} failed: {e}")
+        job.status = ImportJob.Status.FAILED
+        job.error = str(e)
+    finally:
+        progress.close()
+
+    # The upload is only needed while the job runs
+    job.file.delete(save=False)
+    # Row counts were saved by the progress reporter; leave them alone
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'result', 'error', 'finished_at'])
+    return job
+
+
+class ProgressReporter:
+    """Record row counts and heartbeats on an import job while it runs.
+
+    The import runs inside a single transaction, so progress written on the
+    same connection would stay invisible until the import commits. Updates
+    are therefore made from a helper thread, which has its own autocommit
+    connection. Every update is a heartbeat; between progress reports, e.g.
+    while a large chunk is written, one is sent every
+    ``IMPORT_JOB_HEARTBEAT_INTERVAL`` seconds.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._stopped = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self._heartbeat.start()
+
+    def __call__(self, **counts):
+        self._executor.submit(self._save, counts)
+
+    def close(self):
+        self._stopped.set()
+        self._heartbeat.join()
+        # Look the connection up in the helper thread, so its own one is closed
+        self._executor.submit(lambda: connection.close())
+        self._executor.shutdown(wait=True)
+
+    def _beat(self):
+        while not self._stopped.wait(settings.IMPORT_JOB_HEARTBEAT_INTERVAL):
+            self._executor.submit(self._save, {})
+
+    def _save(self, counts):
+        try:
+            ImportJob.objects.filter(pk=self.job_id).update(heartbeat_at=timezone.now(), **counts)
+        except Exception as e:
+            logger.warning(f"Could not record progress for import job {self.job_id}: {e}")
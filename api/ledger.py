@@ -0,0 +1,64 @@
+import hashlib
+import logging
+from django.db import IntegrityError, transaction
+from .models import ImportLedger
+from .uploads import BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def upload_sha256(files):
+    """Return the SHA-256 identifying the content of one or more uploaded files.
+
+    Uploads received through the hashing upload handlers carry their digest;
+    other files are read once more to hash them. Several files are
+    identified by the hash of their hashes, in upload order.
+    """
+    hashes = [getattr(file, 'sha256', None) or _file_sha256(file) for file in files]
+    if len(hashes) == 1:
+        return hashes[0]
+    return hashlib.sha256('\n'.join(hashes).encode()).hexdigest()
+
+
+def find_import(sha256, mode, all_sheets):
+    """Return the ledger entry of an earlier import of the same content and options, or None."""
+    return ImportLedger.objects.filter(sha256=sha256, mode=mode, all_sheets=all_sheets).first()
+
+
+def record_import(sha256, mode, all_sheets, file_name, result):
+    """Store the result of an import in the ledger, as part of the import's transaction.
+
+    When the same content is being imported concurrently, the first import
+    to commit keeps its entry.
+    """
+    try:
+        with transaction.atomic():
+            ImportLedger.objects.update_or_create(
+                sha256=sha256, mode=mode, all_sheets=all_sheets,
+                defaults={'file_name': file_name[:255], 'result': result}
+            )
+    except IntegrityError:
+        logger.info(f"Import of {sha256} was recorded by a concurrent upload")
+
+
+def forget_imports(using='default'):
+    """Delete every ledger entry, as part of a transaction deleting employees.
+
+    A replayed result claims the rows of its file are stored; once
+    employees are deleted that no longer holds for any entry, so the next
+    upload of each file is imported again.
+    """
+    ImportLedger.objects.using(using).all().delete()
+
+
+def replayed_result(entry):
+    """Return a ledger entry's result, marked as coming from the ledger."""
+    return dict(entry.result, ledger={'replayed': True, 'imported_at': entry.updated_at.isoformat()})
+
+
+def _file_sha256(file):
+    digest = hashlib.sha256()
+    for data in file.chunks(BUFFER_SIZE):
+        digest.update(data)
+    file.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,233 @@
+import csv
+import hashlib
+import io
+from decimal import Decimal
+from operator import itemgetter
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from .metrics import ImportProfile
+from .models import Employee
+
+# Employee fields written by an import, in staging table column order
+EMPLOYEE_FIELDS = [
+    'company_id', 'employee_id', 'first_name', 'last_name', 'phone_number',
+    'salary', 'manager_id', 'department_id', 'row_hash'
+]
+# Fields covered by the unique_employee_per_company constraint
+KEY_FIELDS = ['company_id', 'employee_id']
+# Fields an upsert may change on a stored employee
+UPDATE_FIELDS = [name for name in EMPLOYEE_FIELDS if name not in KEY_FIELDS]
+# Fields that make up the row hash
+HASHED_FIELDS = ['first_name', 'last_name', 'phone_number', 'salary', 'manager_id', 'department_id']
+
+
+def employee_key(employee):
+    """Return the (company_id, employee_id) key of an employee field dict."""
+    return employee['company_id'], employee['employee_id']
+
+
+def employee_hash(employee):
+    """Return a hash of the imported values of an employee field dict."""
+    values = [employee[name] for name in HASHED_FIELDS]
+    values[3] = format(Decimal(values[3]).quantize(Decimal('0.01')), 'f')
+    content = '\x1f'.join(str(value) for value in values)
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def stored_keys(keys):
+    """Return the (company_id, employee_id) keys of ``keys`` that are already stored."""
+    return set(stored_employees(keys, hashed=False))
+
+
+def stored_employees(keys, hashed=True):
+    """Map the (company_id, employee_id) keys that are already stored to (id, hash of the stored values).
+
+    The hash is computed from the stored columns rather than read from
+    ``row_hash``, which writes outside imports, e.g. in the admin, leave as
+    it was. With ``hashed=False`` the hash is None and only ids are read.
+    """
+    if not keys:
+        return {}
+    rows = Employee.objects.filter(
+        company_id__in={company_id for company_id, _ in keys},
+        employee_id__in={employee_id for _, employee_id in keys}
+    ).values('company_id', 'employee_id', 'id', *(HASHED_FIELDS if hashed else []))
+    return {
+        (row['company_id'], row['employee_id']): (row['id'], employee_hash(row) if hashed else None)
+        for row in rows
+        if (row['company_id'], row['employee_id']) in keys
+    }
+
+
+def get_employee_loader(profile=None):
+    """Return the employee loader selected by the EMPLOYEE_LOAD_ENGINE setting.
+
+    The COPY engine needs PostgreSQL; every other backend uses bulk_create.
+    Loader stages are timed on ``profile`` when one is given.
+    """
+    if settings.EMPLOYEE_LOAD_ENGINE == 'copy' and connection.vendor == 'postgresql':
+        return CopyLoader(profile=profile)
+    return BulkCreateLoader(batch_size=settings.IMPORT_BATCH_SIZE, profile=profile)
+
+
+class EmployeeLoader:
+    """Base class for the employee load engines.
+
+    Subclasses implement ``insert`` and ``update``; ``upsert`` combines them.
+    """
+
+    name = None
+
+    def __init__(self, profile=None):
+        self.profile = profile or ImportProfile()
+
+    def insert(self, employees):
+        """Insert a list of employee field dicts, skipping stored employees.
+
+        Returns the (company_id, employee_id) keys that were inserted.
+        """
+        raise NotImplementedError
+
+    def update(self, employees):
+        """Overwrite stored employees from field dicts that carry their ``id``."""
+        raise NotImplementedError
+
+    def upsert(self, employees):
+        """Insert new employees and update the stored ones whose values changed.
+
+        Unchanged employees are not written. Returns the keys that were
+        inserted and the keys that were updated.
+        """
+        with self.profile.stage('existing_ids'):
+            stored = stored_employees({employee_key(employee) for employee in employees})
+        new_employees = []
+        changed_employees = []
+        for employee in employees:
+            match = stored.get(employee_key(employee))
+            if match is None:
+                new_employees.append(employee)
+            elif match[1] != employee['row_hash']:
+                changed_employees.append(dict(employee, id=match[0]))
+
+        inserted = self.insert(new_employees) if new_employees else set()
+        if changed_employees:
+            self.update(changed_employees)
+        return inserted, {employee_key(employee) for employee in changed_employees}
+
+
+class BulkCreateLoader(EmployeeLoader):
+    """Write employees through the ORM in batches of ``batch_size``."""
+
+    name = 'bulk_create'
+
+    def __init__(self, batch_size, profile=None):
+        super().__init__(profile=profile)
+        self.batch_size = batch_size
+
+    def insert(self, employees):
+        keys = {employee_key(employee) for employee in employees}
+        with self.profile.stage('existing_ids'):
+            existing = stored_keys(keys)
+
+        new_employees = [employee for employee in employees if employee_key(employee) not in existing]
+        with self.profile.stage('bulk_load'):
+            Employee.objects.bulk_create(
+                [Employee(**employee) for employee in new_employees],
+                batch_size=self.batch_size,
+                ignore_conflicts=True
+            )
+        return keys - existing
+
+    def update(self, employees):
+        # bulk_update skips auto_now, so set updated_at here
+        now = timezone.now()
+        with self.profile.stage('bulk_load'):
+            Employee.objects.bulk_update(
+                [Employee(updated_at=now, **employee) for employee in employees],
+                UPDATE_FIELDS + ['updated_at'],
+                batch_size=self.batch_size
+            )
+
+
+class CopyLoader(EmployeeLoader):
+    """Write employees with PostgreSQL COPY through temporary staging tables.
+
+    Rows are streamed into a staging table with COPY and then applied with
+    one set-based statement, so no model instances are built. Inserts use
+    ON CONFLICT DO NOTHING, so the unique constraint on (company,
+    employee_id) skips employees that already exist. Must run inside a
+    transaction; the staging tables are dropped on commit.
+    """
+
+    name = 'copy'
+
+    def insert(self, employees):
+        if not employees:
+            return set()
+
+        table = self._quote(Employee._meta.db_table)
+        columns = self._columns(EMPLOYEE_FIELDS)
+        key_columns = self._columns(KEY_FIELDS)
+
+        with self.profile.stage('bulk_load'), connection.cursor() as cursor:
+            staging = self._stage(cursor, 'employee_staging', EMPLOYEE_FIELDS, employees)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}, created_at, updated_at) "
+                f"SELECT {columns}, now(), now() FROM {staging} "
+                f"ON CONFLICT ({key_columns}) DO NOTHING "
+                f"RETURNING {key_columns}"
+            )
+            return set(cursor.fetchall())
+
+    def update(self, employees):
+        table = self._quote(Employee._meta.db_table)
+        assignments = ', '.join(
+            f"{column} = staged.{column}"
+            for column in map(self._column, UPDATE_FIELDS)
+        )
+
+        with self.profile.stage('bulk_load'), connection.cursor() as cursor:
+            # Matching the company too lets a partitioned table be joined
+            # partition by partition
+            staging = self._stage(cursor, 'employee_update_staging', ['id', 'company_id'] + UPDATE_FIELDS, employees)
+            cursor.execute(
+                f"UPDATE {table} SET {assignments}, updated_at = now() "
+                f"FROM {staging} AS staged "
+                f"WHERE {table}.company_id = staged.company_id AND {table}.id = staged.id"
+            )
+
+    def _stage(self, cursor, name, fields, employees):
+        """Copy ``fields`` of the employees into an empty temporary table and return its name."""
+        staging = self._quote(name)
+        columns = self._columns(fields)
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+            f"SELECT {columns} FROM {self._quote(Employee._meta.db_table)} WITH NO DATA"
+        )
+        cursor.execute(f"TRUNCATE {staging}")
+
+        # Quote every string so empty values load as '' rather than NULL
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerows(map(itemgetter(*fields), employees))
+        buffer.seek(0)
+
+        sql = f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2
+            cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        return staging
+
+    def _column(self, name):
+        return self._quote(Employee._meta.get_field(name).column)
+
+    def _columns(self, names):
+        return ', '.join(map(self._column, names))
+
+    def _quote(self, name):
+        return connection.ops.quote_name(name)
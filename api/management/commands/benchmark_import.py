@@ -0,0 +1,180 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from urllib.parse import urlparse
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from api.loaders import get_employee_loader
+from api.metrics import percentile
+from api.reports import delete_report
+from api.samples import write_import_file
+from api.views import FileUploadViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark file imports end to end through the upload view on synthetic files "
+        "and write a JSON report. Every import is rolled back, so no data is left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[1000, 10000, 100000],
+            help='Row counts to benchmark (default: 1000 10000 100000)'
+        )
+        parser.add_argument(
+            '--formats', nargs='+', choices=['csv', 'xlsx', 'parquet', 'feather'], default=['csv', 'xlsx'],
+            help='File formats to benchmark'
+        )
+        parser.add_argument('--companies', type=int, default=10, help='Distinct companies (default 10)')
+        parser.add_argument(
+            '--error-rate', type=float, default=0.01,
+            help='Share of rows that fail validation (default 0.01)'
+        )
+        parser.add_argument(
+            '--duplicate-rate', type=float, default=0.01,
+            help='Share of rows repeating an earlier employee (default 0.01)'
+        )
+        parser.add_argument('--mode', choices=['insert', 'upsert'], default='insert', help='Import mode')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Timed imports per file, used for the latency percentiles (default 5)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0)')
+        parser.add_argument(
+            '--file', action='append', default=[],
+            help='Benchmark an existing file instead of generated ones; may be repeated'
+        )
+        parser.add_argument(
+            '--output', default='import_benchmark.json',
+            help='Where to write the JSON report (default import_benchmark.json)'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1")
+
+        view = FileUploadViewSet.as_view({'post': 'create'})
+        runs = []
+        self.stdout.write(
+            f"{'file':<24}{'rows':>9}{'p50 s':>9}{'p90 s':>9}{'rows/s':>10}{'queries':>9}{'peak MB':>9}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for path, generated in self._files(directory, options):
+                run = self._benchmark(view, path, options['mode'], options['repeat'])
+                run.update(generated)
+                runs.append(run)
+                self.stdout.write(
+                    f"{run['file'][-24:]:<24}{run['rows']:>9}"
+                    f"{run['latency_seconds']['p50']:>9.3f}{run['latency_seconds']['p90']:>9.3f}"
+                    f"{run['rows_per_second']:>10.0f}{run['queries']:>9}"
+                    f"{run['peak_memory_bytes'] / 2 ** 20:>9.1f}"
+                )
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'load_engine': get_employee_loader().name,
+                'chunk_size': settings.IMPORT_CHUNK_SIZE,
+                'batch_size': settings.IMPORT_BATCH_SIZE,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'options': {
+                name: options[name]
+                for name in ['mode', 'repeat', 'companies', 'error_rate', 'duplicate_rate', 'seed']
+            },
+            'runs': runs,
+        }
+        with open(options['output'], 'w') as file:
+            json.dump(report, file, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def _files(self, directory, options):
+        """Yield the files to benchmark with what is known about their content."""
+        for path in options['file']:
+            if not os.path.exists(path):
+                raise CommandError(f"File not found: {path}")
+            yield path, {}
+
+        if options['file']:
+            return
+        for rows in options['rows']:
+            for file_format in options['formats']:
+                path = os.path.join(directory, f"employees_{rows}.{file_format}")
+                summary = write_import_file(
+                    path, rows, options['companies'],
+                    options['error_rate'], options['duplicate_rate'], options['seed']
+                )
+                yield path, {'generated': summary}
+
+    def _benchmark(self, view, path, mode, repeat):
+        """Import ``path`` once profiled and ``repeat`` times timed."""
+        with open(path, 'rb') as file:
+            content = file.read()
+        name = os.path.basename(path)
+
+        # The profiled import traces memory and queries, which slows it down,
+        # so latencies come from separate unprofiled imports
+        result, _ = self._import(view, name, content, mode, profile=True)
+        latencies = [self._import(view, name, content, mode)[1] for _ in range(repeat)]
+
+        profile = result['profile']
+        rows = profile['rows']['read']
+        p50 = percentile(latencies, 50)
+        return {
+            'file': name,
+            'bytes': len(content),
+            'rows': rows,
+            'latency_seconds': {
+                'min': round(min(latencies), 4),
+                'mean': round(statistics.mean(latencies), 4),
+                'p50': round(p50, 4),
+                'p90': round(percentile(latencies, 90), 4),
+                'p99': round(percentile(latencies, 99), 4),
+                'max': round(max(latencies), 4),
+            },
+            'rows_per_second': round(rows / p50, 1) if p50 else None,
+            'queries': profile['queries'],
+            'peak_memory_bytes': profile['peak_memory_bytes'],
+            'stages': profile['stages'],
+            # The response only lists samples of the errors and duplicates;
+            # the report has their counts
+            'statistics': dict(
+                result['statistics'],
+                errors=result.get('report', {}).get('errors', 0),
+                duplicates=result.get('report', {}).get('duplicates', 0),
+            ),
+        }
+
+    def _import(self, view, name, content, mode, profile=False):
+        """Post one upload to the view and roll it back; return the response data and seconds."""
+        factory = APIRequestFactory()
+        request = factory.post(
+            '/api/upload/?profile=1' if profile else '/api/upload/',
+            {'file': SimpleUploadedFile(name, content), 'mode': mode},
+            format='multipart'
+        )
+        with transaction.atomic():
+            started = time.perf_counter()
+            response = view(request)
+            seconds = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        if response.status_code != 201:
+            raise CommandError(f"Import of {name} failed with {response.status_code}: {response.data}")
+        # The import was rolled back; its report file was not
+        if response.data.get('report'):
+            delete_report(resolve(urlparse(response.data['report']['url']).path).kwargs['pk'])
+        return response.data, seconds
+
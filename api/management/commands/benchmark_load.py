@@ -0,0 +1,79 @@
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from api.loaders import BulkCreateLoader, CopyLoader, employee_hash
+from api.models import Company
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the bulk_create and COPY employee load engines on synthetic rows. "
+        "Every run is rolled back, so no data is left behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='Row counts to load (default: 10000 100000 1000000)'
+        )
+        parser.add_argument(
+            '--engines', nargs='+', choices=['bulk_create', 'copy'], default=['bulk_create', 'copy'],
+            help='Load engines to compare'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.IMPORT_CHUNK_SIZE,
+            help='Rows handed to the loader at a time, as the importer does'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.IMPORT_BATCH_SIZE,
+            help='bulk_create batch size'
+        )
+
+    def handle(self, *args, **options):
+        engines = options['engines']
+        if 'copy' in engines and connection.vendor != 'postgresql':
+            raise CommandError("The copy engine needs PostgreSQL; run with --engines bulk_create")
+
+        loaders = {
+            'bulk_create': BulkCreateLoader(batch_size=options['batch_size']),
+            'copy': CopyLoader(),
+        }
+
+        self.stdout.write(f"{'engine':<12}{'rows':>10}{'seconds':>10}{'rows/s':>12}")
+        for rows in options['rows']:
+            for engine in engines:
+                seconds = self._run(loaders[engine], rows, options['chunk_size'])
+                self.stdout.write(f"{engine:<12}{rows:>10}{seconds:>10.2f}{rows / seconds:>12.0f}")
+
+    def _run(self, loader, rows, chunk_size):
+        """Load ``rows`` employees in chunks and return the seconds spent in the loader."""
+        elapsed = 0.0
+        with transaction.atomic():
+            company = Company.objects.create(name=f"Benchmark {loader.name} {rows}")
+            for start in range(0, rows, chunk_size):
+                employees = self._employees(company.id, start, min(start + chunk_size, rows))
+                started = time.perf_counter()
+                loader.insert(employees)
+                elapsed += time.perf_counter() - started
+            transaction.set_rollback(True)
+        return elapsed
+
+    def _employees(self, company_id, start, stop):
+        employees = [
+            {
+                'company_id': company_id,
+                'employee_id': number,
+                'first_name': f"First{number}",
+                'last_name': f"Last{number}",
+                'phone_number': f"555{number:07d}",
+                'salary': Decimal(1000 + number % 5000) + Decimal('0.50'),
+                'manager_id': number % 100 + 1,
+                'department_id': number % 10 + 1,
+            }
+            for number in range(start + 1, stop + 1)
+        ]
+        for employee in employees:
+            employee['row_hash'] = employee_hash(employee)
+        return employees
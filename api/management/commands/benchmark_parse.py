@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from api.readers import CSV_ENGINES, XLSX_ENGINES, read_chunks, resolve_engine
+from api.samples import write_import_file
+from api.serializers import FileUploadSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare the installed CSV and Excel reader engines on synthetic or given files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, nargs='+', default=[100000, 1000000],
+            help='Row counts of the generated files (default: 100000 1000000)'
+        )
+        parser.add_argument(
+            '--formats', nargs='+', choices=['csv', 'xlsx'], default=['csv', 'xlsx'],
+            help='File formats to generate'
+        )
+        parser.add_argument(
+            '--file', action='append', default=[],
+            help='Read an existing file instead of generated ones; may be repeated'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.IMPORT_CHUNK_SIZE,
+            help='Rows per dataframe, as the importer reads them'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'file':<24}{'engine':<10}{'rows':>10}{'seconds':>10}{'rows/s':>12}")
+        with tempfile.TemporaryDirectory() as directory:
+            for path in self._files(directory, options):
+                name = os.path.basename(path)
+                engines = XLSX_ENGINES if path.endswith('.xlsx') else CSV_ENGINES
+                for engine in engines:
+                    if resolve_engine(engine, engines) != engine:
+                        self.stdout.write(f"{name[-24:]:<24}{engine:<10}{'not installed':>32}")
+                        continue
+                    rows, seconds = self._read(path, engine, options['chunk_size'])
+                    self.stdout.write(
+                        f"{name[-24:]:<24}{engine:<10}{rows:>10}{seconds:>10.2f}{rows / seconds:>12.0f}"
+                    )
+
+    def _files(self, directory, options):
+        for path in options['file']:
+            if not os.path.exists(path):
+                raise CommandError(f"File not found: {path}")
+            yield path
+
+        if options['file']:
+            return
+        for rows in options['rows']:
+            for file_format in options['formats']:
+                path = os.path.join(directory, f"employees_{rows}.{file_format}")
+                write_import_file(path, rows, 10, error_rate=0.01, duplicate_rate=0.01)
+                yield path
+
+    def _read(self, path, engine, chunk_size):
+        """Read every chunk of ``path`` with ``engine``; return the row count and seconds taken."""
+        rows = 0
+        with open(path, 'rb') as file:
+            started = time.perf_counter()
+            chunks = read_chunks(
+                File(file, name=os.path.basename(path)), chunk_size,
+                text_columns=FileUploadSerializer.TEXT_COLUMNS,
+                xlsx_engine=engine, csv_engine=engine
+            )
+            for df in chunks:
+                rows += len(df)
+            return rows, time.perf_counter() - started
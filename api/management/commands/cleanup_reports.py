@@ -0,0 +1,27 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Delete import reports older than a given age from MEDIA_ROOT/reports/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=settings.IMPORT_REPORT_MAX_AGE,
+            help='Seconds after which a report is deleted '
+                 f'(default: {settings.IMPORT_REPORT_MAX_AGE})'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options['max_age']
+        directory = os.path.join(settings.MEDIA_ROOT, 'reports')
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        deleted = 0
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith('.csv') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                deleted += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} report(s)"))
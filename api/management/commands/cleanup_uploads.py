@@ -0,0 +1,45 @@
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import UploadSession
+from api.uploads import part_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable uploads nobody touched for a while, with the bytes they "
+        "received, and .part files left without an upload."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age', type=int, default=settings.UPLOAD_MAX_AGE,
+            help='Seconds since the last chunk after which an upload is deleted '
+                 f'(default: {settings.UPLOAD_MAX_AGE})'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['max_age'])
+
+        # Finalized uploads moved their file to the import queue already
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        for session in stale.filter(status=UploadSession.Status.OPEN).iterator():
+            if os.path.exists(part_path(session)):
+                os.remove(part_path(session))
+        sessions, _ = stale.delete()
+
+        # Files of uploads deleted without DELETE, e.g. in the admin
+        directory = os.path.join(settings.MEDIA_ROOT, 'uploads')
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        kept = {f"{pk}.part" for pk in UploadSession.objects.values_list('pk', flat=True)}
+        files = 0
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith('.part') and name not in kept and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+                files += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {sessions} stale upload(s) and {files} orphaned .part file(s)"
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.readers import COLUMNAR_EXTENSIONS, pyarrow
+from api.samples import write_import_file
+
+
+class Command(BaseCommand):
+    help = "Write a synthetic CSV, XLSX, Parquet or Arrow employee file for testing and benchmarking imports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file; the .csv, .xlsx, .parquet, .arrow or .feather extension picks the format')
+        parser.add_argument('--rows', type=int, default=10000, help='Data rows to write (default 10000)')
+        parser.add_argument('--companies', type=int, default=10, help='Distinct companies (default 10)')
+        parser.add_argument(
+            '--error-rate', type=float, default=0.0,
+            help='Share of rows that fail validation (default 0)'
+        )
+        parser.add_argument(
+            '--duplicate-rate', type=float, default=0.0,
+            help='Share of rows repeating an earlier employee of the same company (default 0)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default 0)')
+
+    def handle(self, *args, **options):
+        if not options['path'].endswith(('.csv', '.xlsx') + COLUMNAR_EXTENSIONS):
+            raise CommandError("The output file must end in .csv, .xlsx, .parquet, .arrow or .feather")
+        if options['path'].endswith(COLUMNAR_EXTENSIONS) and pyarrow is None:
+            raise CommandError("Writing Parquet and Arrow files needs pyarrow")
+        if options['companies'] < 1:
+            raise CommandError("--companies must be at least 1")
+        if options['error_rate'] + options['duplicate_rate'] > 1:
+            raise CommandError("--error-rate and --duplicate-rate must add up to at most 1")
+
+        summary = write_import_file(
+            options['path'], options['rows'], options['companies'],
+            options['error_rate'], options['duplicate_rate'], options['seed']
+        )
+        self.stdout.write(
+            f"Wrote {summary['rows']} rows to {options['path']} "
+            f"({summary['errors']} invalid, {summary['duplicates']} duplicates)"
+        )
@@ -0,0 +1,227 @@
+import http.client
+import json
+import os
+import platform
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.metrics import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test read endpoints of a running server with concurrent keep-alive clients "
+        "and report requests per second and latency percentiles per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Base URL of the server (default http://127.0.0.1:8000)'
+        )
+        parser.add_argument(
+            '--path', action='append', default=[],
+            help='Path to request; may be repeated '
+                 '(default: /api/companies/, /api/employees/ and /api/employees/stats/)'
+        )
+        parser.add_argument('--concurrency', type=int, default=16, help='Parallel clients (default 16)')
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Seconds to load each path for (default 10)'
+        )
+        parser.add_argument(
+            '--revalidate', action='store_true',
+            help='Send the ETag of the first response in If-None-Match, like a polling dashboard'
+        )
+        parser.add_argument(
+            '--check-import', metavar='FILE',
+            help='Instead of a load test, upload FILE and check that every client, kept-alive on '
+                 'whichever worker accepted it, sees the new employees rather than a 304'
+        )
+        parser.add_argument('--label', default='', help='Name of this run in the report, e.g. gunicorn')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https') or not url.netloc:
+            raise CommandError(f"Not an http(s) URL: {options['url']}")
+
+        paths = options['path'] or ['/api/companies/', '/api/employees/', '/api/employees/stats/']
+        if options['check_import']:
+            self._check_import(url, [path for path in paths if path.startswith('/api/employees')], options)
+            return
+
+        results = []
+        self.stdout.write(
+            f"{'path':<32}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        )
+        for path in paths:
+            result = self._load(url, url.path.rstrip('/') + path, options)
+            results.append(result)
+            latency = result['latency_ms']
+            self.stdout.write(
+                f"{path[-32:]:<32}{result['requests']:>10}{result['errors']:>8}"
+                f"{result['requests_per_second']:>10.1f}{latency['p50']:>9.1f}"
+                f"{latency['p99']:>9.1f}{latency['max']:>9.1f}"
+            )
+
+        if options['output']:
+            report = {
+                'created_at': timezone.now().isoformat(),
+                'label': options['label'],
+                'url': options['url'],
+                'python': platform.python_version(),
+                'options': {name: options[name] for name in ['concurrency', 'duration', 'revalidate']},
+                'results': results,
+            }
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def _load(self, url, path, options):
+        """Request ``path`` from every client until the duration is up."""
+        headers = {}
+        if options['revalidate']:
+            status, response_headers = _request(_connect(url), path, {})
+            if status != 200:
+                raise CommandError(f"GET {path} returned {status}")
+            if 'etag' in response_headers:
+                headers['If-None-Match'] = response_headers['etag']
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        started = time.perf_counter()
+        deadline = started + options['duration']
+
+        def client():
+            connection = _connect(url)
+            mine = []
+            failed = 0
+            while time.perf_counter() < deadline:
+                sent = time.perf_counter()
+                try:
+                    status, _ = _request(connection, path, headers)
+                except (OSError, http.client.HTTPException):
+                    # The server may close kept-alive connections, e.g. when
+                    # a worker restarts; retry once on a new one
+                    connection.close()
+                    connection = _connect(url)
+                    try:
+                        status, _ = _request(connection, path, headers)
+                    except (OSError, http.client.HTTPException):
+                        connection.close()
+                        connection = _connect(url)
+                        status = None
+                mine.append(time.perf_counter() - sent)
+                if status not in (200, 304):
+                    failed += 1
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+                errors.append(failed)
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            for future in [executor.submit(client) for _ in range(options['concurrency'])]:
+                future.result()
+        seconds = time.perf_counter() - started
+
+        milliseconds = [latency * 1000 for latency in latencies] or [0]
+        return {
+            'path': path,
+            'requests': len(latencies),
+            'errors': sum(errors),
+            'requests_per_second': round(len(latencies) / seconds, 1),
+            'latency_ms': {
+                'mean': round(statistics.mean(milliseconds), 2),
+                'p50': round(percentile(milliseconds, 50), 2),
+                'p90': round(percentile(milliseconds, 90), 2),
+                'p99': round(percentile(milliseconds, 99), 2),
+                'max': round(max(milliseconds), 2),
+            },
+        }
+
+
+    def _check_import(self, url, paths, options):
+        """Upload a file and revalidate employee responses on every client's connection.
+
+        Each kept-alive connection stays with the worker that accepted it,
+        so with more clients than workers every worker is asked whether the
+        ETag it handed out before the import still matches. A 304 means
+        that worker missed the import.
+        """
+        if not paths:
+            raise CommandError("--check-import needs an /api/employees path")
+        prefix = url.path.rstrip('/')
+        connections = [_connect(url) for _ in range(options['concurrency'])]
+        etags = {}
+        for number, connection in enumerate(connections):
+            for path in paths:
+                status, headers = _request(connection, prefix + path, {})
+                if status != 200 or 'etag' not in headers:
+                    raise CommandError(f"GET {path} returned {status} without an ETag")
+                etags[number, path] = headers['etag']
+
+        status, result = _upload(_connect(url), f"{prefix}/api/upload/?force=1&mode=upsert", options['check_import'])
+        if status not in (200, 201):
+            raise CommandError(f"Upload returned {status}: {result}")
+        statistics = result.get('statistics', {})
+        if not statistics.get('employees_created') and not statistics.get('employees_updated'):
+            raise CommandError("The upload changed no employees; use a file with new or changed rows")
+
+        stale = []
+        for (number, path), etag in etags.items():
+            status, _ = _request(connections[number], prefix + path, {'If-None-Match': etag})
+            if status == 304:
+                stale.append(path)
+        for connection in connections:
+            connection.close()
+        checked = len(etags)
+        if stale:
+            raise CommandError(
+                f"{len(stale)} of {checked} responses still matched the ETag from before the import: "
+                "some workers do not share the cache holding the data versions"
+            )
+        self.stdout.write(self.style.SUCCESS(f"All {checked} responses changed after the import"))
+
+
+def _connect(url):
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    return connection_class(url.netloc, timeout=30)
+
+
+def _request(connection, path, headers):
+    """Send one GET over a kept-alive connection; return the status and lowercased headers."""
+    connection.request('GET', path, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response.status, {name.lower(): value for name, value in response.getheaders()}
+
+
+def _upload(connection, path, file_path):
+    """POST a file to the upload endpoint as multipart form data; return the status and JSON body."""
+    boundary = uuid.uuid4().hex
+    with open(file_path, 'rb') as file:
+        content = file.read()
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+        f'filename="{os.path.basename(file_path)}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    connection.request('POST', path, body=body, headers={
+        'Content-Type': f'multipart/form-data; boundary={boundary}'
+    })
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    try:
+        return response.status, json.loads(data)
+    except ValueError:
+        return response.status, {}
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from api.partitions import employee_partitions, partition_employees
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the employees into a table hash-partitioned on company, or back into one "
+        "table with --partitions 0. Writes to employees wait until the rows are moved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=settings.EMPLOYEE_PARTITIONS,
+            help='Number of partitions, 0 for one table (default: EMPLOYEE_PARTITIONS)'
+        )
+
+    def handle(self, *args, **options):
+        partitions = options['partitions']
+        if connection.vendor != 'postgresql':
+            raise CommandError("Partitioning needs PostgreSQL")
+        if partitions < 0:
+            raise CommandError("--partitions must be 0 or more")
+        if employee_partitions(connection) == partitions:
+            self.stdout.write(f"The employee table already has {partitions} partitions")
+            return
+
+        def progress(company_id, rows):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Company {company_id}: moved {rows} employees")
+
+        try:
+            with transaction.atomic():
+                partition_employees(connection, partitions, progress)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if partitions:
+            self.stdout.write(self.style.SUCCESS(f"Partitioned the employee table into {partitions} partitions"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Moved the employees back into one table"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.hierarchy import rebuild_hierarchy
+from api.models import Company
+from api.versions import bump_data_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized manager hierarchy of employees, e.g. after they were "
+        "changed outside an import or for data loaded before the hierarchy existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company', action='append', default=[],
+            help='Rebuild only this company, by name; may be repeated (default: every company)'
+        )
+
+    def handle(self, *args, **options):
+        companies = Company.objects.all()
+        if options['company']:
+            companies = companies.filter(name__in=options['company'])
+        names = dict(companies.values_list('id', 'name'))
+        missing = set(options['company']) - set(names.values())
+        if missing:
+            raise CommandError(f"Unknown companies: {', '.join(sorted(missing))}")
+
+        for company_id, name in sorted(names.items(), key=lambda item: item[1]):
+            with transaction.atomic():
+                warnings = rebuild_hierarchy({company_id: name})
+            for warning in warnings:
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: employee {warning['employee_id']} "
+                    f"(manager {warning['manager_id']}): {warning['warning']}"
+                ))
+        bump_data_version('employees')
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the hierarchy of {len(names)} companies"))
@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from api.checks import check_shared_cache
+from api.jobs import claim_next_job, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued background imports. Several workers, in one process or "
+        "many, can share the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of imports to run at the same time (default: 1)'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help='Seconds to wait before checking an empty queue again (default: 2)'
+        )
+        parser.add_argument(
+            '--heartbeat-timeout', type=float, default=settings.IMPORT_JOB_HEARTBEAT_TIMEOUT,
+            help='Seconds without a heartbeat after which a running job is queued again '
+                 f'(default: {settings.IMPORT_JOB_HEARTBEAT_TIMEOUT})'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs'
+        )
+
+    def handle(self, *args, **options):
+        # Imports bump the data versions of the server processes only
+        # through a shared cache
+        for error in check_shared_cache(import_worker=True):
+            raise CommandError(f"{error.msg} {error.hint}")
+
+        self.stopping = threading.Event()
+        self.stdout.write(f"Import worker started with {options['workers']} worker(s)")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [
+                pool.submit(self._work, options['poll_interval'], options['heartbeat_timeout'], options['once'])
+                for _ in range(options['workers'])
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping after the running imports finish")
+                self.stopping.set()
+
+    def _work(self, poll_interval, heartbeat_timeout, once):
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                # Jobs of workers that died while running them
+                requeued = requeue_stale_jobs(heartbeat_timeout)
+                if requeued:
+                    self.stdout.write(f"Queued {requeued} stalled import job(s) again")
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        return
+                    self.stopping.wait(poll_interval)
+                    continue
+
+                self.stdout.write(f"Running import job {job.pk} ({job.file_name})")
+                job = run_job(job)
+                self.stdout.write(f"Import job {job.pk} {job.status}")
+        finally:
+            connection.close()
@@ -0,0 +1,169 @@
+import itertools
+import math
+import time
+import tracemalloc
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.db import connection
+
+
+class Counter:
+    """A Prometheus counter with labels, summed over every process.
+
+    Each series is an integer in the default cache, which is shared between
+    the server processes and run_import_worker, so any of them serves the
+    same totals. ``labels`` maps each label to every value it can take, so
+    the series can be read back without listing cache keys; ``scale`` keeps
+    fractions of the amounts, e.g. microseconds of a counter in seconds.
+    """
+
+    def __init__(self, name, documentation, labels=None, scale=1):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.scale = scale
+
+    def _key(self, values):
+        return ':'.join(('metrics', self.name, *values))
+
+    def inc(self, amount=1, **labels):
+        values = tuple(labels[label] for label in self.labels)
+        for label, value in zip(self.labels, values):
+            if value not in self.labels[label]:
+                raise ValueError(f"{value!r} is not a value of label {label} of {self.name}")
+        key = self._key(values)
+        delta = round(amount * self.scale)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # The first increment of the series in any process
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, delta)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        series = list(itertools.product(*self.labels.values()))
+        stored = cache.get_many([self._key(values) for values in series])
+        for values in series:
+            value = stored.get(self._key(values), 0) / self.scale
+            labels = ','.join(f'{label}="{item}"' for label, item in zip(self.labels, values))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return '\n'.join(lines)
+
+
+# Every stage an import profile times
+STAGES = (
+    'parse_wait', 'read', 'validate_file_content', 'process_data', 'save_companies',
+    'existing_ids', 'bulk_load', 'hierarchy',
+)
+IMPORTS = Counter(
+    'employee_imports_total', 'File imports run, by outcome.', {'outcome': ('completed', 'failed')}
+)
+IMPORT_ROWS = Counter(
+    'employee_import_rows_total', 'Rows handled by file imports, by kind.',
+    {'kind': ('read', 'validated', 'created', 'updated')}
+)
+IMPORT_STAGE_SECONDS = Counter(
+    'employee_import_stage_seconds_total', 'Wall time spent in each import stage.', {'stage': STAGES},
+    scale=1000000
+)
+IMPORT_STAGE_CALLS = Counter(
+    'employee_import_stage_calls_total', 'Times each import stage ran.', {'stage': STAGES}
+)
+REGISTRY = [IMPORTS, IMPORT_ROWS, IMPORT_STAGE_SECONDS, IMPORT_STAGE_CALLS]
+
+
+def render_metrics():
+    """Return every metric, summed over all processes, in the Prometheus text format."""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class ImportProfile:
+    """Time the stages of one import.
+
+    Stage wall times always feed the shared metrics; that costs two clock
+    reads per stage. When ``enabled``, queries and traced memory are also
+    measured and ``report()`` summarises them for the response.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.rows = {}
+        self.stages = {}
+        self.queries = 0
+        self.peak_memory = 0
+        self.seconds = None
+        self._started = None
+        self._stop_tracing = False
+        self._query_wrapper = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        if self.enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._stop_tracing = True
+            tracemalloc.reset_peak()
+            self._query_wrapper = connection.execute_wrapper(self._count_query)
+            self._query_wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.seconds = time.perf_counter() - self._started
+        if self.enabled:
+            self._query_wrapper.__exit__(exc_type, exc, traceback)
+            if self._stop_tracing:
+                tracemalloc.stop()
+
+        IMPORTS.inc(outcome='failed' if exc_type else 'completed')
+        for kind, count in self.rows.items():
+            IMPORT_ROWS.inc(count, kind=kind)
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the code run inside the block as part of stage ``name``."""
+        stats = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        if self.enabled:
+            queries = self.queries
+            tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stats['seconds'] += elapsed
+            stats['calls'] += 1
+            IMPORT_STAGE_SECONDS.inc(elapsed, stage=name)
+            IMPORT_STAGE_CALLS.inc(stage=name)
+
+            if self.enabled:
+                peak = tracemalloc.get_traced_memory()[1]
+                stats['queries'] = stats.get('queries', 0) + self.queries - queries
+                stats['peak_memory_bytes'] = max(stats.get('peak_memory_bytes', 0), peak)
+                self.peak_memory = max(self.peak_memory, peak)
+
+    def report(self):
+        """Summarise a finished import for the ``profile`` key of the response."""
+        rows_read = self.rows.get('read', 0)
+        return {
+            'seconds': round(self.seconds, 4),
+            'rows': dict(self.rows),
+            'rows_per_second': round(rows_read / self.seconds, 1) if self.seconds else None,
+            'queries': self.queries,
+            'peak_memory_bytes': self.peak_memory,
+            'stages': {
+                name: dict(stats, seconds=round(stats['seconds'], 4))
+                for name, stats in self.stages.items()
+            },
+        }
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
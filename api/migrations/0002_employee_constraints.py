@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:31
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_employees(apps, schema_editor):
+    """Keep the first row of every (company, employee_id) so the unique constraint applies."""
+    Employee = apps.get_model('api', 'Employee')
+    duplicates = (
+        Employee.objects.values('company_id', 'employee_id')
+        .annotate(first_id=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        Employee.objects.filter(
+            company_id=duplicate['company_id'],
+            employee_id=duplicate['employee_id']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department_id'], name='api_employee_department_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['manager_id'], name='api_employee_manager_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_employees, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='employee',
+            constraint=models.UniqueConstraint(fields=('company', 'employee_id'), name='unique_employee_per_company'),
+        ),
+    ]
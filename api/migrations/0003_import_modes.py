@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_employee_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(default='insert', max_length=20),
+        ),
+    ]
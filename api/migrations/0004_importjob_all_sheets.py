@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_import_modes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='all_sheets',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_importjob_all_sheets'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['salary', 'id'], name='api_employee_salary_idx'),
+        ),
+    ]
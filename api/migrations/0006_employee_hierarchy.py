@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_employee_salary_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='hierarchy_depth',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='hierarchy_path',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['company', 'hierarchy_path'], name='api_employee_hierarchy_idx', opclasses=['int8_ops', 'text_pattern_ops']),
+        ),
+    ]
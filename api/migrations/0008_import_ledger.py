@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='force',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ImportLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('mode', models.CharField(default='insert', max_length=20)),
+                ('all_sheets', models.BooleanField(default=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sha256', 'mode', 'all_sheets'), name='unique_import_per_content')],
+            },
+        ),
+    ]
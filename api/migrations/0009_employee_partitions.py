@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def partition(apps, schema_editor):
+    """Partition the employee table when EMPLOYEE_PARTITIONS is set, on PostgreSQL only."""
+    from api.partitions import employee_partitions, partition_employees
+
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or not settings.EMPLOYEE_PARTITIONS:
+        return
+    if employee_partitions(connection) != settings.EMPLOYEE_PARTITIONS:
+        partition_employees(connection, settings.EMPLOYEE_PARTITIONS)
+
+
+def unpartition(apps, schema_editor):
+    from api.partitions import employee_partitions, partition_employees
+
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql' and employee_partitions(connection):
+        partition_employees(connection, 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_import_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
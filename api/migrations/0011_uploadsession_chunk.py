@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_importjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='chunk_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='chunk_token',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 
 # Create your models here.
@@ -22,8 +23,113 @@ class Employee(models.Model):
     salary = models.DecimalField(max_digits=10, decimal_places=2)
     manager_id = models.IntegerField()
     department_id = models.IntegerField()
+    # Hash of the values last written by an import. Upserts hash the stored
+    # columns themselves, so other writes need not keep it current.
+    row_hash = models.CharField(max_length=32, blank=True, default='')
+    # Employee ids from the top of the organisation down to this employee,
+    # e.g. '/1/4/9/', and the number of managers above it. Maintained by
+    # imports; null while unknown, e.g. for employees in a management cycle.
+    hierarchy_path = models.TextField(null=True, blank=True)
+    hierarchy_depth = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'employee_id'], name='unique_employee_per_company')
+        ]
+        indexes = [
+            models.Index(fields=['department_id'], name='api_employee_department_idx'),
+            models.Index(fields=['manager_id'], name='api_employee_manager_idx'),
+            models.Index(fields=['salary', 'id'], name='api_employee_salary_idx'),
+            # text_pattern_ops lets PostgreSQL use the index for path prefix
+            # (LIKE 'path%') lookups; other backends ignore opclasses
+            models.Index(
+                fields=['company', 'hierarchy_path'],
+                name='api_employee_hierarchy_idx',
+                opclasses=['int8_ops', 'text_pattern_ops']
+            ),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
+
+class ImportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    file = models.FileField(upload_to='imports/')
+    file_name = models.CharField(max_length=255)
+    mode = models.CharField(max_length=20, default='insert')
+    all_sheets = models.BooleanField(default=False)
+    # Import the file again even when the import ledger has its result
+    force = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True)
+    rows_read = models.PositiveIntegerField(default=0)
+    rows_validated = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Written by the worker running the job while it is alive; a running job
+    # without a recent heartbeat is queued again
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+class UploadSession(models.Model):
+    """A file uploaded in byte ranges, imported by a background job once complete."""
+
+    class Status(models.TextChoices):
+        OPEN = 'open', 'Open'
+        FINALIZED = 'finalized', 'Finalized'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    # Declared size of the whole file and bytes received so far
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    mode = models.CharField(max_length=20, default='insert')
+    all_sheets = models.BooleanField(default=False)
+    # SHA-256 of the whole file, computed when the upload is finalized
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
+    job = models.OneToOneField(ImportJob, null=True, blank=True, on_delete=models.SET_NULL)
+    # Reservation of the request writing the next chunk, which streams it to
+    # disk outside any transaction
+    chunk_token = models.UUIDField(null=True, blank=True)
+    chunk_started_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.offset}/{self.size} bytes)"
+
+class ImportLedger(models.Model):
+    """The result of importing a file, looked up by its content.
+
+    An upload with the same SHA-256 and options is answered with the stored
+    result instead of being imported again.
+    """
+    # SHA-256 of the file, or of the hashes of several files in upload order
+    sha256 = models.CharField(max_length=64)
+    mode = models.CharField(max_length=20, default='insert')
+    all_sheets = models.BooleanField(default=False)
+    file_name = models.CharField(max_length=255)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sha256', 'mode', 'all_sheets'], name='unique_import_per_content')
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.sha256[:12]})"
@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class EmployeeCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key.
+
+    Each page is a ``WHERE id > last_id ORDER BY id LIMIT n`` query, so deep
+    pages cost the same as the first one.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,115 @@
+import logging
+from .models import Employee
+
+logger = logging.getLogger(__name__)
+
+
+def employee_partitions(connection):
+    """Return the number of hash partitions of the employee table, 0 when it is a plain table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(inhrelid) FROM pg_partitioned_table "
+            "LEFT JOIN pg_inherits ON inhparent = partrelid "
+            "WHERE partrelid = %s::regclass",
+            [Employee._meta.db_table]
+        )
+        return cursor.fetchone()[0]
+
+
+def partition_employees(connection, partitions, progress=None):
+    """Rebuild the employee table with ``partitions`` hash partitions on company_id.
+
+    PostgreSQL only. With 0 partitions the table is rebuilt as a plain
+    table again. The rows are copied company by company into a new table,
+    which then replaces the old one with the same indexes, constraints and
+    id sequence. Writes to the employee table wait until the caller's
+    transaction ends; reads go on while the rows are copied. The primary
+    key of a partitioned table is (id, company_id), because every unique
+    constraint has to include the partition key; ids stay unique as they
+    still come from one sequence.
+
+    ``progress`` is called with (company_id, rows) after each company is
+    copied. Must run inside a transaction.
+    """
+    table = Employee._meta.db_table
+    quote = connection.ops.quote_name
+    new_table = f'{table}_new'
+    new_sequence = f'{table}_id_seq_new'
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {quote(table)} IN EXCLUSIVE MODE")
+        cursor.execute(
+            "SELECT conrelid::regclass::text FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND conrelid <> confrelid",
+            [table]
+        )
+        referencing = [row[0] for row in cursor.fetchall()]
+        if referencing:
+            raise ValueError(f"{table} is referenced by {', '.join(referencing)}")
+
+        # Constraints and indexes are recreated on the new table by their
+        # definitions; NOT NULL constraints are copied by LIKE
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c') ORDER BY contype DESC",
+            [table]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass "
+            "AND indexrelid NOT IN (SELECT conindid FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table]
+        )
+        indexes = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+
+        cursor.execute(f"CREATE SEQUENCE {quote(new_sequence)}")
+        partition_by = ' PARTITION BY HASH (company_id)' if partitions else ''
+        cursor.execute(f"CREATE TABLE {quote(new_table)} (LIKE {quote(table)}){partition_by}")
+        cursor.execute(
+            f"ALTER TABLE {quote(new_table)} ALTER id SET DEFAULT nextval(%s::regclass)",
+            [new_sequence]
+        )
+        for remainder in range(partitions):
+            cursor.execute(
+                f"CREATE TABLE {quote(f'{new_table}_p{remainder}')} PARTITION OF {quote(new_table)} "
+                f"FOR VALUES WITH (MODULUS {partitions:d}, REMAINDER {remainder:d})"
+            )
+
+        # One company at a time, so each INSERT writes a single partition
+        cursor.execute(f"SELECT company_id, count(*) FROM {quote(table)} GROUP BY company_id ORDER BY company_id")
+        for company_id, rows in cursor.fetchall():
+            cursor.execute(
+                f"INSERT INTO {quote(new_table)} SELECT * FROM {quote(table)} WHERE company_id = %s",
+                [company_id]
+            )
+            if progress is not None:
+                progress(company_id, rows)
+        cursor.execute(
+            f"SELECT setval(%s::regclass, COALESCE(max(id), 0) + 1, false) FROM {quote(new_table)}",
+            [new_sequence]
+        )
+
+        # Deferred foreign key checks of rows written earlier in the
+        # transaction have to run before the table can be dropped; Django
+        # declares its foreign keys INITIALLY DEFERRED, so defer them again
+        # afterwards
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+        # Dropping the old table also drops its partitions and id sequence
+        cursor.execute(f"DROP TABLE {quote(table)}")
+        cursor.execute(f"ALTER TABLE {quote(new_table)} RENAME TO {quote(table)}")
+        for remainder in range(partitions):
+            cursor.execute(
+                f"ALTER TABLE {quote(f'{new_table}_p{remainder}')} RENAME TO {quote(f'{table}_p{remainder}')}"
+            )
+        cursor.execute(f"ALTER SEQUENCE {quote(new_sequence)} RENAME TO {quote(f'{table}_id_seq')}")
+        cursor.execute(f"ALTER SEQUENCE {quote(f'{table}_id_seq')} OWNED BY {quote(table)}.id")
+
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = 'PRIMARY KEY (id, company_id)' if partitions else 'PRIMARY KEY (id)'
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+        for definition in indexes:
+            cursor.execute(definition)
+
+    logger.info("Rebuilt %s with %d partitions", table, partitions)
@@ -0,0 +1,340 @@
+import csv
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, time
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Parsers for each file type; 'auto' picks the first one installed. calamine
+# is faster than openpyxl but loads the whole sheet into memory, while
+# openpyxl streams it in read-only mode, so calamine is only used when asked
+# for. pandas and openpyxl are always installed.
+XLSX_ENGINES = ['openpyxl', 'calamine']
+CSV_ENGINES = ['pyarrow', 'pandas']
+
+# Columnar formats, read with pyarrow when it is installed
+PARQUET_EXTENSIONS = ('.parquet',)
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+# The strings pandas reads as missing values; the pyarrow reader uses them too
+NA_VALUES = sorted(pd._libs.parsers.STR_NA_VALUES)
+
+
+def read_chunks(file, chunk_size, sheet=None, text_columns=(), xlsx_engine='auto', csv_engine='auto'):
+    """Yield an uploaded Excel, CSV, Parquet or Arrow file as dataframes of at most ``chunk_size`` rows.
+
+    Chunks keep a running index, so ``index + 2`` is still the spreadsheet row
+    of each record. A file with a header and no data yields one empty frame.
+    Workbooks are read from ``sheet``, or from their first sheet. CSV columns
+    named in ``text_columns`` are read as strings; the others become numbers
+    when every value in the chunk is one. Parquet and Arrow columns keep the
+    types stored in the file.
+    """
+    if file.name.endswith(COLUMNAR_EXTENSIONS):
+        if pyarrow is None:
+            raise ValueError("pyarrow is needed to read Parquet and Arrow files")
+        if file.name.endswith(PARQUET_EXTENSIONS):
+            return _read_parquet_chunks(file, chunk_size)
+        return _read_arrow_chunks(file, chunk_size)
+
+    if file.name.endswith('.xlsx'):
+        if resolve_engine(xlsx_engine, XLSX_ENGINES) == 'calamine':
+            rows = _calamine_rows(file, sheet)
+        else:
+            rows = _openpyxl_rows(file, sheet)
+        return _row_chunks(rows, chunk_size)
+
+    if resolve_engine(csv_engine, CSV_ENGINES) == 'pyarrow':
+        return _read_pyarrow_chunks(file, chunk_size, text_columns)
+    return _read_csv_chunks(file, chunk_size, text_columns)
+
+
+def resolve_engine(engine, engines):
+    """Return ``engine`` if it is installed, else the first installed one of ``engines``."""
+    available = [name for name in engines if _installed(name)]
+    if engine in available:
+        return engine
+    if engine != 'auto':
+        logger.warning(f"Reader engine {engine!r} is not available; using {available[0]!r}")
+    return available[0]
+
+
+def _installed(engine):
+    if engine == 'calamine':
+        return python_calamine is not None
+    if engine == 'pyarrow':
+        return pyarrow is not None
+    return True
+
+
+def sheet_names(file):
+    """Return the sheet names of an uploaded workbook, or ``[None]`` for a CSV file."""
+    if not file.name.endswith('.xlsx'):
+        return [None]
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+        file.seek(0)
+
+
+def _read_csv_chunks(file, chunk_size, text_columns):
+    dtype = {column: str for column in text_columns}
+    with pd.read_csv(file, chunksize=chunk_size, dtype=dtype) as reader:
+        yield from reader
+
+
+def _read_pyarrow_chunks(file, chunk_size, text_columns):
+    # Every column is read as text, so a bad value in a later block cannot
+    # break a type pyarrow guessed from the first one; numbers are inferred
+    # per chunk afterwards, as pandas does
+    header = next(csv.reader([file.readline().decode('utf-8-sig')]), [])
+    file.seek(0)
+    # Columns are named like pandas names them, so repeated and blank
+    # header cells get distinct names instead of breaking the column types
+    columns = _header_columns([value or None for value in header])
+    read_options = pyarrow.csv.ReadOptions(column_names=columns, skip_rows=1)
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types={name: pyarrow.string() for name in columns},
+        null_values=NA_VALUES,
+        strings_can_be_null=True
+    )
+
+    start = 0
+    try:
+        reader = pyarrow.csv.open_csv(file, read_options=read_options, convert_options=convert_options)
+        pending = pyarrow.Table.from_batches([], schema=reader.schema)
+        for batch in reader:
+            pending = pyarrow.concat_tables([pending, pyarrow.Table.from_batches([batch])])
+            while pending.num_rows >= chunk_size:
+                yield _arrow_frame(pending.slice(0, chunk_size), start, text_columns)
+                start += chunk_size
+                pending = pending.slice(chunk_size)
+    except pyarrow.ArrowInvalid as e:
+        # pyarrow is stricter than pandas, e.g. about rows with missing
+        # fields. pandas can only take over before any chunk was yielded:
+        # it would resume by physical line, which differs from the record
+        # count when there are blank lines or quoted line breaks
+        if start:
+            raise ValueError(f"Could not parse {file.name} after record {start}: {e}") from e
+        logger.warning(f"pyarrow could not parse {file.name}, reading it with pandas: {e}")
+        file.seek(0)
+        yield from _read_csv_chunks(file, chunk_size, text_columns)
+        return
+
+    if pending.num_rows or start == 0:
+        yield _arrow_frame(pending, start, text_columns)
+
+
+def _arrow_frame(table, start, text_columns):
+    for position, name in enumerate(table.column_names):
+        if name not in text_columns:
+            table = table.set_column(position, name, _infer_numbers(table.column(position)))
+    df = table.to_pandas()
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def _infer_numbers(column):
+    """Cast a text column to integers or floats if every value is one, like pandas' CSV parser."""
+    for number_type in (pyarrow.int64(), pyarrow.float64()):
+        try:
+            return column.cast(number_type)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError):
+            pass
+    return column
+
+
+def _read_parquet_chunks(file, chunk_size):
+    parquet_file = pyarrow.parquet.ParquetFile(_arrow_source(file))
+    batches = parquet_file.iter_batches(batch_size=chunk_size)
+    yield from _batch_chunks(batches, parquet_file.schema_arrow, chunk_size)
+
+
+def _read_arrow_chunks(file, chunk_size):
+    """Read an Arrow IPC file, which includes Feather version 2, or an Arrow IPC stream."""
+    source = _arrow_source(file)
+    try:
+        reader = pyarrow.ipc.open_file(source)
+        batches = (reader.get_batch(number) for number in range(reader.num_record_batches))
+    except pyarrow.ArrowInvalid:
+        source.seek(0)
+        reader = pyarrow.ipc.open_stream(source)
+        batches = iter(reader)
+    yield from _batch_chunks(batches, reader.schema, chunk_size)
+
+
+def _arrow_source(file):
+    """Open an upload for pyarrow, memory-mapped when it is on disk.
+
+    Columns of a memory-mapped file are read in place: record batches point
+    into the mapping instead of being copied into memory.
+    """
+    path = _disk_path(file)
+    if path is not None:
+        return pyarrow.memory_map(path)
+    # Small uploads are kept in memory by Django
+    file.seek(0)
+    return pyarrow.BufferReader(file.read())
+
+
+def _disk_path(file):
+    """Return the path of an upload stored in a local file, or None."""
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    name = getattr(getattr(file, 'file', None), 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    return None
+
+
+def _batch_chunks(batches, schema, chunk_size):
+    """Regroup record batches into dataframes of ``chunk_size`` rows."""
+    start = 0
+    pending = pyarrow.Table.from_batches([], schema=schema)
+    for batch in batches:
+        pending = pyarrow.concat_tables([pending, pyarrow.Table.from_batches([batch])])
+        while pending.num_rows >= chunk_size:
+            yield _columnar_frame(pending.slice(0, chunk_size), start)
+            start += chunk_size
+            pending = pending.slice(chunk_size)
+
+    if pending.num_rows or start == 0:
+        yield _columnar_frame(pending, start)
+
+
+def _columnar_frame(table, start):
+    # Decimals stay Arrow decimals rather than becoming a column of Python
+    # Decimal objects, so salaries are checked column-wise and stay exact
+    df = table.to_pandas(
+        types_mapper=lambda data_type: pd.ArrowDtype(data_type) if pyarrow.types.is_decimal(data_type) else None
+    )
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def _openpyxl_rows(file, sheet):
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _calamine_rows(file, sheet):
+    workbook = python_calamine.CalamineWorkbook.from_filelike(file)
+    if sheet is not None:
+        worksheet = workbook.get_sheet_by_name(sheet)
+    else:
+        worksheet = workbook.get_sheet_by_index(0)
+
+    # Rows start at the first used column; pad them so columns line up with
+    # openpyxl, and return dates as datetimes like openpyxl does
+    padding = (None,) * (worksheet.start[1] if worksheet.start else 0)
+    for row in worksheet.iter_rows():
+        yield padding + tuple(
+            datetime.combine(value, time()) if type(value) is date else value
+            for value in row
+        )
+
+
+def _row_chunks(rows, chunk_size):
+    # The header is the first row with a value. Rows above it still count,
+    # so ``index + 2`` stays the row number shown in the spreadsheet.
+    rows = _sheet_rows(rows)
+    start = 0
+    for header in rows:
+        if any(value is not None for value in header):
+            break
+        start += 1
+    else:
+        raise ValueError("Worksheet is empty")
+
+    columns = _header_columns(header)
+    width = len(columns)
+    chunk = []
+    yielded = False
+    for row in rows:
+        # Match pandas: pad short rows and drop cells beyond the header
+        chunk.append((row + (None,) * width)[:width])
+        if len(chunk) == chunk_size:
+            yield _frame(chunk, columns, start)
+            start += len(chunk)
+            chunk = []
+            yielded = True
+
+    if chunk or not yielded:
+        yield _frame(chunk, columns, start)
+
+
+def _header_columns(header):
+    """Name header cells like ``pd.read_excel`` does.
+
+    Blank cells become ``Unnamed: <position>`` and repeated names get a
+    ``.1``, ``.2``... suffix that no other column has.
+    """
+    columns = [f"Unnamed: {position}" if value is None else value for position, value in enumerate(header)]
+    unnamed = [position for position, value in enumerate(header) if value is None]
+    # Named columns keep their names before unnamed ones are renamed
+    order = [position for position in range(len(columns)) if position not in unnamed] + unnamed
+    counts = defaultdict(int)
+    for position in order:
+        name = original = columns[position]
+        count = counts[name]
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in columns else counts[name]
+        columns[position] = name
+        counts[name] = count + 1
+    return columns
+
+
+def _sheet_rows(rows):
+    """Iterate worksheet values as pandas converts them, without the blank rows at the end.
+
+    Blank rows before the last record are kept, so positions stay aligned
+    with the sheet.
+    """
+    blank_rows = []
+    for row in rows:
+        row = tuple(_convert_cell(value) for value in row)
+        if all(value is None for value in row):
+            blank_rows.append(row)
+            continue
+        yield from blank_rows
+        blank_rows = []
+        yield row
+
+
+def _convert_cell(value):
+    # Excel stores every number as a float; pandas reads whole ones back as int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == '':
+        return None
+    return value
+
+
+def _frame(rows, columns, start):
+    return pd.DataFrame(rows, columns=columns, index=pd.RangeIndex(start, start + len(rows)))
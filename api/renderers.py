@@ -0,0 +1,36 @@
+import json
+from rest_framework.renderers import BaseRenderer
+
+
+class ExportRenderer(BaseRenderer):
+    """Content negotiation target for the export endpoints.
+
+    Exports build their own streaming responses, so these renderers are only
+    used to accept ``?format=`` and ``Accept`` values. The only data they
+    render is an error response, which is sent as JSON.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data).encode()
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class XLSXRenderer(ExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+
+EXPORT_RENDERERS = [CSVRenderer, NDJSONRenderer, XLSXRenderer]
@@ -0,0 +1,103 @@
+import csv
+import os
+import uuid
+from django.conf import settings
+from django.urls import reverse
+
+ERROR = 'error'
+DUPLICATE = 'duplicate'
+# Imported rows with a problem in the reporting hierarchy
+WARNING = 'warning'
+
+
+def report_path(report_id):
+    """Return where the report of an import is stored."""
+    return os.path.join(settings.MEDIA_ROOT, 'reports', f"{report_id}.csv")
+
+
+def delete_report(report_id):
+    """Delete the report of an import, if it has one."""
+    if os.path.exists(report_path(report_id)):
+        os.remove(report_path(report_id))
+
+
+def report_url(report_id, request=None):
+    """Return the download URL of a report, absolute when the request is known."""
+    url = reverse('reports-detail', args=[report_id])
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class ImportReport:
+    """Rows an import rejected or warned about, written to a CSV file as they are found.
+
+    Each line has the kind of problem (error, duplicate or warning), the
+    source and row number, the reason and the values of the row, so the rows
+    can be fixed and imported again. Only counts and the first IMPORT_REPORT_SAMPLES
+    items of each kind are kept in memory. The file is created with the first
+    problem and removed again when the import fails.
+    """
+
+    def __init__(self, columns, request=None):
+        self.id = uuid.uuid4()
+        self.columns = columns
+        self.request = request
+        self.counts = {ERROR: 0, DUPLICATE: 0, WARNING: 0}
+        self.samples = {ERROR: [], DUPLICATE: [], WARNING: []}
+        self._file = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        if exc_type is not None:
+            self.discard()
+
+    def add(self, kind, items):
+        """Record errors, duplicates or warnings: dicts with a row, a reason and optionally ``values``.
+
+        Errors that belong to no row may be plain strings.
+        """
+        for item in items:
+            if isinstance(item, str):
+                item = {'error': item}
+            if self.counts[kind] < settings.IMPORT_REPORT_SAMPLES:
+                self.samples[kind].append({name: value for name, value in item.items() if name != 'values'})
+            self.counts[kind] += 1
+            self._write(kind, item)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Delete the report file, e.g. when the import was rolled back."""
+        self.close()
+        if self._writer is not None:
+            delete_report(self.id)
+
+    def summary(self):
+        """Return the counts and download URL for the response, or None without problems."""
+        if not any(self.counts.values()):
+            return None
+        return {
+            'errors': self.counts[ERROR],
+            'duplicates': self.counts[DUPLICATE],
+            'warnings': self.counts[WARNING],
+            'url': report_url(self.id, self.request),
+        }
+
+    def _write(self, kind, item):
+        if self._writer is None:
+            path = report_path(self.id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(['kind', 'source', 'row', 'reason'] + list(self.columns))
+        values = item.get('values') or [''] * len(self.columns)
+        self._writer.writerow(
+            [kind, item.get('source', ''), item.get('row', ''), item.get('error') or item.get('warning') or item.get('reason', '')]
+            + list(values)
+        )
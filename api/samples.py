@@ -0,0 +1,109 @@
+import csv
+import random
+from decimal import Decimal
+from openpyxl import Workbook
+from .readers import COLUMNAR_EXTENSIONS, PARQUET_EXTENSIONS, pyarrow
+from .serializers import FileUploadSerializer
+
+IMPORT_COLUMNS = FileUploadSerializer.REQUIRED_COLUMNS
+
+# Ways a generated row can fail validation, by column
+ERRORS = {
+    'COMPANY_NAME': '   ',
+    'EMPLOYEE_ID': 'not-a-number',
+    'MANAGER_ID': 'unknown',
+    'SALARY': -100,
+}
+
+
+def generate_rows(rows, companies, error_rate=0.0, duplicate_rate=0.0, seed=0):
+    """Generate ``rows`` synthetic import rows spread over ``companies`` companies.
+
+    About ``error_rate`` of the rows fail validation and ``duplicate_rate``
+    repeat the (company, employee id) of an earlier valid row. The same seed
+    always gives the same rows. Returns the row iterator and a dict of the
+    rows, invalid rows and duplicate rows, counted as the rows are consumed.
+    """
+    generator = random.Random(seed)
+    summary = {'rows': 0, 'errors': 0, 'duplicates': 0}
+    next_ids = [1] * companies
+    saved = []
+
+    def rows_with_summary():
+        for _ in range(rows):
+            company = generator.randrange(companies)
+            chance = generator.random()
+            if chance < error_rate:
+                summary['errors'] += 1
+                column = generator.choice(list(ERRORS))
+                row = _row(generator, company, next_ids[company])
+                row[IMPORT_COLUMNS.index(column)] = ERRORS[column]
+            elif chance < error_rate + duplicate_rate and saved:
+                summary['duplicates'] += 1
+                company, employee_id = generator.choice(saved)
+                row = _row(generator, company, employee_id)
+            else:
+                row = _row(generator, company, next_ids[company])
+                saved.append((company, next_ids[company]))
+                next_ids[company] += 1
+            summary['rows'] += 1
+            yield row
+
+    return rows_with_summary(), summary
+
+
+def write_import_file(path, rows, companies, error_rate=0.0, duplicate_rate=0.0, seed=0):
+    """Write a synthetic import file, CSV, XLSX, Parquet or Arrow depending on ``path``.
+
+    Returns the number of rows, invalid rows and duplicate rows written.
+    """
+    generated, summary = generate_rows(rows, companies, error_rate, duplicate_rate, seed)
+    if str(path).endswith(COLUMNAR_EXTENSIONS):
+        _write_columnar(path, list(generated))
+    elif str(path).endswith('.xlsx'):
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        worksheet.append(IMPORT_COLUMNS)
+        for row in generated:
+            worksheet.append(row)
+        workbook.save(path)
+    else:
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(IMPORT_COLUMNS)
+            writer.writerows(generated)
+    return summary
+
+
+def _write_columnar(path, rows):
+    """Write rows as a Parquet or Arrow file, with typed columns where the values allow."""
+    columns = list(zip(*rows)) if rows else [()] * len(IMPORT_COLUMNS)
+    table = pyarrow.table({
+        name: _arrow_column(name, values) for name, values in zip(IMPORT_COLUMNS, columns)
+    })
+    if str(path).endswith(PARQUET_EXTENSIONS):
+        pyarrow.parquet.write_table(table, path)
+    else:
+        pyarrow.feather.write_feather(table, path)
+
+
+def _arrow_column(name, values):
+    # Columns holding a generated error, e.g. a text employee id, are text
+    if all(type(value) is int for value in values):
+        return pyarrow.array(values, pyarrow.int64())
+    if name == 'SALARY' and all(type(value) in (int, float) for value in values):
+        return pyarrow.array([Decimal(str(value)) for value in values], pyarrow.decimal128(10, 2))
+    return pyarrow.array([str(value) for value in values], pyarrow.string())
+
+
+def _row(generator, company, employee_id):
+    return [
+        f"Company {company + 1:05d}",
+        f"First{employee_id}",
+        f"Last{employee_id}",
+        f"555{generator.randrange(10 ** 7):07d}",
+        employee_id,
+        generator.randint(1, max(employee_id - 1, 1)),
+        generator.randint(1, 20),
+        round(generator.uniform(1000, 20000), 2),
+    ]
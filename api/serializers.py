@@ -1,12 +1,84 @@
 from rest_framework import serializers
-from .models import Company, Employee
+from .models import Company, Employee, ImportJob, UploadSession
 import pandas as pd
+import numpy as np
+from pandas.api.types import is_bool_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype
 from decimal import Decimal
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from operator import itemgetter
 import logging
+import django
+from django.conf import settings
+from django.core.files import File
 from django.db import transaction
+from .bulk import RecordError, record_frames
+from .companies import resolve_companies
+from .hierarchy import rebuild_hierarchy
+from .ledger import find_import, record_import, replayed_result, upload_sha256
+from .loaders import employee_hash, employee_key, get_employee_loader
+from .metrics import ImportProfile
+from .readers import COLUMNAR_EXTENSIONS, pyarrow, read_chunks, sheet_names
+from .reports import DUPLICATE, ERROR, WARNING, ImportReport
+from .versions import bump_data_version
 
 logger = logging.getLogger(__name__)
 
+# Values the column checks accept without falling back to per-row conversion.
+INTEGER_PATTERN = r'\s*[+-]?\d{1,15}\s*'
+DECIMAL_PATTERN = r'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*'
+
+
+def _string_mask(series):
+    """Mask of the values in a column that are Python strings."""
+    if is_string_dtype(series.dtype) and not is_object_dtype(series.dtype):
+        return series.notna()
+    return series.map(type).eq(str)
+
+
+def _numeric_column(series, pattern):
+    """Convert a column to numbers in one pass.
+
+    Returns the numbers and a mask of the values that are plain numbers or
+    strings matching ``pattern``; anything else is left for row-by-row checks.
+    """
+    if is_bool_dtype(series.dtype):
+        return series.astype('float64'), pd.Series(False, index=series.index)
+    if isinstance(series.dtype, pd.ArrowDtype):
+        # Decimal columns of Parquet and Arrow files; the exact values are
+        # still taken from the column itself
+        numbers = series.astype('float64')
+        return numbers, numbers.notna()
+    if is_numeric_dtype(series.dtype):
+        return series, series.notna()
+
+    is_text = _string_mask(series)
+    text = series.where(is_text, '').astype(str)
+    accepted = (is_text & text.str.fullmatch(pattern)) | series.map(type).isin([int, float, Decimal])
+    numbers = pd.to_numeric(series.where(accepted), errors='coerce')
+    return numbers, accepted & numbers.notna()
+
+
+def _integer_column(series):
+    """Column equivalent of ``int(value)``; returns (values, ok mask)."""
+    numbers, ok = _numeric_column(series, INTEGER_PATTERN)
+    ok &= np.isfinite(numbers.astype('float64')) & (numbers.abs() < 2 ** 53)
+    return numbers.where(ok, 0).astype('int64'), ok
+
+
+def _text_column(series):
+    """Column equivalent of ``str(value).strip()``."""
+    if is_string_dtype(series.dtype) and not is_object_dtype(series.dtype):
+        return series.fillna('nan').str.strip()
+    return series.map(str).astype(object).str.strip()
+
+
 class CompanySerializer(serializers.ModelSerializer):
     class Meta:
         model = Company
@@ -20,79 +92,381 @@ class EmployeeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Employee
-        fields = '__all__'
+        # Listed rather than '__all__' so bookkeeping columns maintained by
+        # imports (row_hash, hierarchy_path, hierarchy_depth) stay internal
+        fields = [
+            'id', 'company', 'employee_id', 'first_name', 'last_name', 'phone_number',
+            'salary', 'manager_id', 'department_id', 'created_at', 'updated_at'
+        ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """Accept an optional ``fields`` list to serialize only those fields."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        exclude = ['file']
 
 class FileUploadSerializer(serializers.Serializer):
-    file = serializers.FileField()
+    MODE_INSERT = 'insert'
+    MODE_UPSERT = 'upsert'
+    FILE_EXTENSIONS = ('.xlsx', '.csv') + (COLUMNAR_EXTENSIONS if pyarrow else ())
+    FORMAT_ERROR = (
+        "Unsupported file format. Only Excel (.xlsx), CSV, Parquet and Arrow (.arrow, .feather) files "
+        "are supported." if pyarrow else
+        "Unsupported file format. Only Excel (.xlsx) and CSV files are supported."
+    )
+
+    file = serializers.FileField(required=False)
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        required=False,
+        help_text="several files imported together in one transaction"
+    )
+    all_sheets = serializers.BooleanField(
+        default=False,
+        help_text="import every sheet of Excel files instead of only the first"
+    )
+    mode = serializers.ChoiceField(
+        choices=[MODE_INSERT, MODE_UPSERT],
+        default=MODE_INSERT,
+        help_text="insert skips stored employees; upsert updates the ones whose values changed"
+    )
 
     REQUIRED_COLUMNS = [
         'COMPANY_NAME', 'FIRST_NAME', 'LAST_NAME', 'PHONE_NUMBER',
         'EMPLOYEE_ID', 'MANAGER_ID', 'DEPARTMENT_ID', 'SALARY'
     ]
+    # Statistics that count written rows, with the table they are written
+    # to; when one is non-zero, cached responses built from that table are
+    # invalidated
+    CHANGE_STATISTICS = {
+        'companies_created': 'companies',
+        'employees_created': 'employees',
+        'employees_updated': 'employees',
+    }
+    # Employee values in the order of REQUIRED_COLUMNS after COMPANY_NAME
+    EMPLOYEE_FIELDS = [
+        'first_name', 'last_name', 'phone_number',
+        'employee_id', 'manager_id', 'department_id', 'salary'
+    ]
+    # Columns read from CSV files as strings, without type inference. The
+    # company name stays inferred so numeric names are still rejected.
+    TEXT_COLUMNS = ['FIRST_NAME', 'LAST_NAME', 'PHONE_NUMBER']
+    # Parsed chunks a parse worker may have waiting for the import
+    PARSE_QUEUE_SIZE = 2
 
     @transaction.atomic
     def create(self, validated_data):
-        file = validated_data['file']
-        
-        # Read the file
+        # A file imported before with the same options is answered from the
+        # import ledger, unless the ``force`` context flag is set
+        files = self._files(validated_data)
+        options = (validated_data.get('mode', self.MODE_INSERT), validated_data.get('all_sheets', False))
+        sha256 = upload_sha256(files)
+        entry = None if self.context.get('force') else find_import(sha256, *options)
+        if entry is not None:
+            return replayed_result(entry)
+
+        # Stage timings are always recorded; queries and memory only when
+        # the ``profile`` context flag is set
+        profile = ImportProfile(enabled=self.context.get('profile', False))
+        report = ImportReport(self.REQUIRED_COLUMNS, self.context.get('request'))
+        with profile, report:
+            result, load_failed = self._import(validated_data, profile, report)
+        # Rejected rows are part of the file's result, but a chunk the
+        # database failed to load, e.g. on a deadlock, may load on a retry
+        if not load_failed:
+            record_import(sha256, *options, ', '.join(file.name for file in files), result)
+        changed = {
+            table for name, table in self.CHANGE_STATISTICS.items()
+            if result['statistics'].get(name)
+        }
+        if changed:
+            transaction.on_commit(lambda: bump_data_version(*changed))
+        if profile.enabled:
+            result['profile'] = profile.report()
+        return result
+
+    def earlier_import(self, validated_data):
+        """Return the import ledger entry of an earlier import of this upload, or None."""
+        return find_import(
+            upload_sha256(self._files(validated_data)),
+            validated_data.get('mode', self.MODE_INSERT),
+            validated_data.get('all_sheets', False)
+        )
+
+    def _files(self, validated_data):
+        files = [validated_data['file']] if 'file' in validated_data else []
+        return files + validated_data.get('files', [])
+
+    def _import(self, validated_data, profile, report):
+        """Import the uploaded files; return the response and whether loading a chunk failed."""
+        files = self._files(validated_data)
+        mode = validated_data.get('mode', self.MODE_INSERT)
+        all_sheets = validated_data.get('all_sheets', False)
+        companies_created = 0
+        employees_created = 0
+        employees_updated = 0
+        employees_unchanged = 0
+
+        # Every file, or every sheet of every workbook, is imported as one source
+        sources = [
+            (file, sheet)
+            for file in files
+            for sheet in (self._sheet_names(file) if all_sheets else [None])
+        ]
+        # Rows are only numbered within their source, so name it when there are several
+        labelled = len(sources) > 1
+
+        # Company ids seen so far, filled per chunk
+        company_ids = {}
+        # Companies whose employees were written; their hierarchy is rebuilt
+        changed_companies = set()
+        loader = get_employee_loader(profile)
+        rows_read = 0
+        rows_validated = 0
+        load_failed = False
+
+        # Read, validate and insert the sources one chunk at a time
+        for (file, sheet), chunk in self._parse(sources, profile):
+            chunk_rows, unique_companies, employees_list, chunk_errors, chunk_duplicates = chunk
+            report.add(ERROR, self._labelled(chunk_errors, file, sheet) if labelled else chunk_errors)
+
+            # Resolve companies not seen in earlier chunks, creating missing ones
+            new_companies = unique_companies - company_ids.keys()
+            if new_companies:
+                with profile.stage('save_companies'):
+                    resolved, created = resolve_companies(sorted(new_companies))
+                company_ids.update(resolved)
+                companies_created += created
+
+            rows_read += chunk_rows
+            rows_validated += len(employees_list)
+            load_errors = []
+            created, updated, unchanged = self._save_employees(
+                loader, mode, employees_list, company_ids, load_errors, chunk_duplicates, changed_companies
+            )
+            report.add(ERROR, load_errors)
+            load_failed = load_failed or bool(load_errors)
+            employees_created += created
+            employees_updated += updated
+            employees_unchanged += unchanged
+            self._report_progress(rows_read, rows_validated, employees_created)
+            report.add(DUPLICATE, self._labelled(chunk_duplicates, file, sheet) if labelled else chunk_duplicates)
+
+        # Materialize reporting chains once every chunk is loaded, since a
+        # manager may come after the employees reporting to them
+        if changed_companies:
+            names = {pk: name for name, pk in company_ids.items()}
+            with profile.stage('hierarchy'):
+                warnings = rebuild_hierarchy({pk: names[pk] for pk in changed_companies})
+            report.add(WARNING, self._warnings(warnings))
+
+        profile.rows.update(
+            read=rows_read,
+            validated=rows_validated,
+            created=employees_created,
+            updated=employees_updated,
+        )
+
+        # Prepare response
+        statistics = {
+            'companies_created': companies_created,
+            'employees_created': employees_created,
+        }
+        if mode == self.MODE_UPSERT:
+            statistics['employees_updated'] = employees_updated
+            statistics['employees_unchanged'] = employees_unchanged
+        return self._prepare_response(statistics, report), load_failed
+
+    def _parse(self, sources, profile):
+        """Yield ((file, sheet), chunk) for every parsed chunk of the sources, in order.
+
+        With several sources and IMPORT_PARSE_WORKERS above one, sources are
+        read and validated in worker processes; the caller still gets the
+        chunks in source order and loads them in its own transaction.
+        """
+        workers = min(settings.IMPORT_PARSE_WORKERS, len(sources))
+        if workers <= 1:
+            for file, sheet in sources:
+                for chunk in self._parse_source(file, sheet, profile, len(sources) > 1):
+                    yield (file, sheet), chunk
+            return
+
+        # The manager is shut down first on the way out, so workers blocked
+        # on a full queue fail instead of keeping the executor waiting
+        with tempfile.TemporaryDirectory() as directory, \
+                ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor, \
+                multiprocessing.Manager() as manager:
+            paths = {}
+            for file, _ in sources:
+                if id(file) not in paths:
+                    paths[id(file)] = self._local_path(file, directory, len(paths))
+
+            # One source per worker is in flight, and each hands over its
+            # chunks through a queue of PARSE_QUEUE_SIZE, so at most that
+            # many parsed chunks per worker wait for their turn in memory
+            def submit(file, sheet):
+                chunks = manager.Queue(maxsize=self.PARSE_QUEUE_SIZE)
+                future = executor.submit(_parse_file, paths[id(file)], file.name, sheet, True, chunks)
+                return file, sheet, chunks, future
+
+            remaining = iter(sources)
+            pending = deque(itertools.starmap(submit, itertools.islice(remaining, workers)))
+            while pending:
+                file, sheet, chunks, future = pending.popleft()
+                while True:
+                    with profile.stage('parse_wait'):
+                        chunk = _next_chunk(chunks, future)
+                    if chunk is None:
+                        break
+                    yield (file, sheet), chunk
+                # Raise what the worker raised, e.g. a ValidationError
+                future.result()
+                pending.extend(itertools.starmap(submit, itertools.islice(remaining, 1)))
+
+    def _parse_source(self, file, sheet, profile, labelled=False):
+        """Read and validate one CSV file or sheet.
+
+        Yields (rows read, companies, employees, errors, duplicates) for each chunk.
+        """
+        chunks = self._read_chunks(file, sheet)
+        for number in itertools.count():
+            with profile.stage('read'):
+                df = next(chunks, None)
+            if df is None:
+                return
+
+            if number == 0:
+                with profile.stage('validate_file_content'):
+                    try:
+                        self._validate_file_content(df)
+                    except serializers.ValidationError as e:
+                        if not labelled:
+                            raise
+                        raise serializers.ValidationError(
+                            dict(e.detail, source=self._source_label(file, sheet))
+                        )
+
+            with profile.stage('process_data'):
+                yield (len(df),) + self._process_data(df)
+
+    def _source_label(self, file, sheet):
+        """Name a source in errors: the file name, followed by ``:sheet`` for workbooks."""
+        return file.name if sheet is None else f"{file.name}:{sheet}"
+
+    def _labelled(self, items, file, sheet):
+        """Add the source of each error or duplicate to it."""
+        source = self._source_label(file, sheet)
+        return [dict(item, source=source) for item in items]
+
+    def _sheet_names(self, file):
         try:
-            if file.name.endswith('.xlsx'):
-                df = pd.read_excel(file)
-            else:
-                df = pd.read_csv(file)
+            return sheet_names(file)
         except Exception as e:
             logger.error(f"Error reading file: {e}")
             raise serializers.ValidationError("Unable to read file. Please check format.")
 
-        # Validate file content
-        self._validate_file_content(df)
-        
-        # Process all the data
-        unique_companies, employees_list, errors, duplicates = self._process_data(df)
-        
-        # Save companies in bulk
-        companies_created = self._save_companies(unique_companies)
-        
-        # Get all companies we just created or already existed
-        all_companies = {c.name: c for c in Company.objects.filter(name__in=unique_companies)}
-        
-        # Get existing employee IDs to avoid duplicates
-        existing_ids = set(Employee.objects.filter(
-            company__in=all_companies.values()
-        ).values_list('employee_id', flat=True))
-        
-        # Prepare employee records for bulk creation
-        employees_to_create = []
+    def _local_path(self, file, directory, number):
+        """Return a path worker processes can open the upload from."""
+        if hasattr(file, 'temporary_file_path'):
+            return file.temporary_file_path()
+        path = os.path.join(directory, f"{number}{os.path.splitext(file.name)[1]}")
+        with open(path, 'wb') as local_file:
+            for data in file.chunks():
+                local_file.write(data)
+        return path
+
+    def _report_progress(self, rows_read, rows_validated, rows_inserted):
+        """Pass running row counts to the optional ``progress`` callable in the context."""
+        progress = self.context.get('progress')
+        if progress is not None:
+            progress(rows_read=rows_read, rows_validated=rows_validated, rows_inserted=rows_inserted)
+
+    def _read_chunks(self, file, sheet=None):
+        """Yield the uploaded file as dataframes of at most IMPORT_CHUNK_SIZE rows."""
+        chunks = read_chunks(
+            file, settings.IMPORT_CHUNK_SIZE, sheet, self.TEXT_COLUMNS,
+            xlsx_engine=settings.IMPORT_XLSX_ENGINE,
+            csv_engine=settings.IMPORT_CSV_ENGINE
+        )
+        while True:
+            try:
+                df = next(chunks)
+            except StopIteration:
+                return
+            except Exception as e:
+                logger.error(f"Error reading file: {e}")
+                raise serializers.ValidationError("Unable to read file. Please check format.")
+            yield df
+
+    def _save_employees(self, loader, mode, employees_list, company_ids, errors, duplicates,
+                        changed_companies):
+        """Load one chunk of employees.
+
+        In insert mode the unique (company, employee_id) constraint decides
+        which rows duplicate stored employees. In upsert mode stored employees
+        are updated when their row hash changed and left alone otherwise.
+        The ids of companies with written employees are added to
+        ``changed_companies``. Returns the number of employees created,
+        updated and unchanged.
+        """
+        upsert = mode == self.MODE_UPSERT
+
+        # Prepare employee records for bulk loading. A repeated (company,
+        # employee_id) in the chunk is a duplicate: inserts keep the first
+        # row, upserts keep the last.
+        records = []
+        employees_to_save = {}
         for emp_data in employees_list:
             row = emp_data.pop('row')
             company_name = emp_data.pop('company_name')
-            
-            # Skip duplicates
-            if emp_data['employee_id'] in existing_ids:
+            if company_name not in company_ids:
+                continue
+
+            emp_data['company_id'] = company_ids[company_name]
+            emp_data['row_hash'] = employee_hash(emp_data)
+            key = employee_key(emp_data)
+            if upsert or key not in employees_to_save:
+                employees_to_save[key] = emp_data
+            records.append((row, company_name, key, emp_data))
+
+        if not employees_to_save:
+            return 0, 0, 0
+
+        # Bulk load employees; a savepoint keeps a failed chunk from
+        # aborting the chunks after it
+        try:
+            with transaction.atomic():
+                if upsert:
+                    inserted, updated = loader.upsert(list(employees_to_save.values()))
+                else:
+                    inserted, updated = loader.insert(list(employees_to_save.values())), set()
+        except Exception as e:
+            logger.error(f"Error creating employees: {e}")
+            errors.append(f"Failed to create employees: {str(e)}")
+            return 0, 0, 0
+        changed_companies.update(company_id for company_id, _ in inserted | updated)
+
+        # Report every row that was not the one saved for its employee, and
+        # in insert mode the rows of employees that were already stored
+        for row, company_name, key, emp_data in records:
+            repeated = employees_to_save[key] is not emp_data
+            if repeated or not (upsert or key in inserted):
                 duplicates.append({
                     "row": row,
                     "company": company_name,
-                    "employee_id": emp_data['employee_id']
+                    "employee_id": key[1],
+                    "reason": "Repeated in the upload" if repeated else "Employee already exists",
+                    "values": [company_name] + [emp_data[field] for field in self.EMPLOYEE_FIELDS],
                 })
-                continue
-                
-            if company_name in all_companies:
-                emp_data['company'] = all_companies[company_name]
-                employees_to_create.append(Employee(**emp_data))
-                existing_ids.add(emp_data['employee_id'])  # Mark as processed
-        
-        # Bulk create employees
-        employees_created = 0
-        if employees_to_create:
-            try:
-                Employee.objects.bulk_create(employees_to_create)
-                employees_created = len(employees_to_create)
-            except Exception as e:
-                logger.error(f"Error creating employees: {e}")
-                errors.append(f"Failed to create employees: {str(e)}")
 
-        # Prepare response
-        return self._prepare_response(companies_created, employees_created, errors, duplicates)
+        unchanged = len(employees_to_save) - len(inserted) - len(updated) if upsert else 0
+        return len(inserted), len(updated), unchanged
 
     def _validate_file_content(self, df):
         """Validate that file has all required columns and contains data."""
@@ -108,59 +482,92 @@ class FileUploadSerializer(serializers.Serializer):
             raise serializers.ValidationError({"data": "File contains no data"})
     
     def _process_data(self, df):
-        """Process dataframe rows and extract company and employee data."""
-        unique_companies = set()
-        employees_list = []
+        """Validate dataframe columns in bulk and extract company and employee data.
+
+        Casts and checks run over whole columns; only rows failing one of them
+        are replayed through the row-by-row checks, so their error messages are
+        the same as before.
+        """
         errors = []
         duplicates = []
-        
-        # Process each row
-        for index, row in df.iterrows():
+        rows = df.index + 2
+
+        # Company names must be non-blank strings
+        company_ok = _string_mask(df['COMPANY_NAME'])
+        company_names = _text_column(df['COMPANY_NAME'].where(company_ok, ''))
+        company_ok &= company_names != ''
+
+        # Salary must be a positive number
+        salaries, salary_ok = _numeric_column(df['SALARY'], DECIMAL_PATTERN)
+        salary_ok &= np.isfinite(salaries.astype('float64')) & (salaries > 0)
+
+        # Employee ID must be a positive integer
+        employee_ids, employee_id_ok = _integer_column(df['EMPLOYEE_ID'])
+        employee_id_ok &= employee_ids > 0
+
+        manager_ids, manager_id_ok = _integer_column(df['MANAGER_ID'])
+        department_ids, department_id_ok = _integer_column(df['DEPARTMENT_ID'])
+
+        valid = company_ok & salary_ok & employee_id_ok & manager_id_ok & department_id_ok
+
+        # Build employee records for the rows that passed every check
+        valid_rows = df.loc[valid]
+        columns = {
+            'first_name': _text_column(valid_rows['FIRST_NAME']).tolist(),
+            'last_name': _text_column(valid_rows['LAST_NAME']).tolist(),
+            'phone_number': _text_column(valid_rows['PHONE_NUMBER']).tolist(),
+            'employee_id': employee_ids[valid].tolist(),
+            'manager_id': manager_ids[valid].tolist(),
+            'department_id': department_ids[valid].tolist(),
+            'salary': [
+                value if type(value) is Decimal else Decimal(str(value))
+                for value in valid_rows['SALARY'].tolist()
+            ],
+            'row': rows[valid.to_numpy()].tolist(),
+            'company_name': company_names[valid].tolist(),
+        }
+        employees = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        unique_companies = set(company_names[valid])
+
+        # Re-check the remaining rows one by one to report why they failed
+        rechecked = []
+        for index, row in df.loc[~valid].iterrows():
             try:
                 # Get and validate company name
                 company_name = row['COMPANY_NAME']
                 if not isinstance(company_name, str) or not company_name.strip():
                     errors.append({
                         "row": index + 2,
-                        "error": "Invalid company name"
+                        "error": "Invalid company name",
+                        "values": self._row_values(row)
                     })
                     continue
-                
+
                 company_name = company_name.strip()
                 unique_companies.add(company_name)
-                
+
                 # Prepare employee data
                 employee = self._prepare_employee_data(row)
                 employee['row'] = index + 2
                 employee['company_name'] = company_name
-                employees_list.append(employee)
-                
+                rechecked.append(employee)
+
             except Exception as e:
                 errors.append({
-                    "row": index + 2, 
-                    "error": str(e)
+                    "row": index + 2,
+                    "error": str(e),
+                    "values": self._row_values(row)
                 })
-                
+
+        employees_list = list(heapq.merge(employees, rechecked, key=itemgetter('row')))
         return unique_companies, employees_list, errors, duplicates
-    
-    def _save_companies(self, company_names):
-        """Save all unique companies in bulk."""
-        # Get existing companies
-        existing_companies = set(Company.objects.filter(
-            name__in=company_names
-        ).values_list('name', flat=True))
-        
-        # Create new companies
-        new_companies = [Company(name=name) for name in company_names if name not in existing_companies]
-        if new_companies:
-            Company.objects.bulk_create(new_companies)
-            
-        return len(new_companies)
-    
+
     def _prepare_employee_data(self, row):
         """Convert row data to employee fields."""
         # Validate salary
         salary = Decimal(str(row['SALARY']))
+        if salary.is_infinite():
+            raise ValueError("Salary must be a finite number")
         if salary <= 0:
             raise ValueError("Salary must be positive")
 
@@ -180,34 +587,218 @@ class FileUploadSerializer(serializers.Serializer):
             'salary': salary
         }
         
-    def _prepare_response(self, companies_created, employees_created, errors, duplicates):
-        """Format the final response."""
+    def _row_values(self, row):
+        """Return the required columns of a rejected row as read, for the error report."""
+        return ['' if pd.isna(value) else value for value in row[self.REQUIRED_COLUMNS]]
+
+    def _warnings(self, warnings):
+        """Add the values a hierarchy warning is about, in report column order."""
+        for warning in warnings:
+            values = {
+                'COMPANY_NAME': warning['company'],
+                'EMPLOYEE_ID': warning['employee_id'],
+                'MANAGER_ID': warning['manager_id'],
+            }
+            yield dict(warning, values=[values.get(column, '') for column in self.REQUIRED_COLUMNS])
+
+    def _prepare_response(self, statistics, report):
+        """Format the final response.
+
+        Errors, duplicates and hierarchy warnings are only sampled; every one
+        of them is in the downloadable report, whose counts and URL are under
+        ``report``.
+        """
         response = {
             'message': 'File import completed',
-            'statistics': {
-                'companies_created': companies_created,
-                'employees_created': employees_created,
-            }
+            'statistics': statistics
         }
-        
-        if errors:
-            response['errors'] = errors
-        
-        if duplicates:
-            response['duplicates'] = duplicates
+
+        if report.samples[ERROR]:
+            response['errors'] = report.samples[ERROR]
+
+        if report.samples[DUPLICATE]:
+            response['duplicates'] = report.samples[DUPLICATE]
+
+        summary = report.summary()
+        if summary:
+            response['report'] = summary
+
+        if report.samples[WARNING]:
+            response['warnings'] = report.samples[WARNING]
 
         return response
 
+    def validate(self, attrs):
+        if 'file' not in attrs and not attrs.get('files'):
+            raise serializers.ValidationError({"file": "No file was submitted."})
+        return attrs
+
+    def validate_files(self, value):
+        return [self.validate_file(file) for file in value]
+
     def validate_file(self, value):
         """Validate file type and size."""
-        if not value.name.endswith(('.xlsx', '.csv')):
+        if not value.name.endswith(self.FILE_EXTENSIONS):
+            raise serializers.ValidationError(self.FORMAT_ERROR)
+
+        max_size = settings.IMPORT_MAX_UPLOAD_SIZE
+        if value.size > max_size:
             raise serializers.ValidationError(
-                "Unsupported file format. Only Excel (.xlsx) and CSV files are supported."
+                f"File size too large. Maximum file size is {max_size // (1024 * 1024)}MB."
             )
-            
-        if value.size > 10 * 1024 * 1024:  # 10MB limit
+
+        return value
+
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    mode = serializers.ChoiceField(
+        choices=[FileUploadSerializer.MODE_INSERT, FileUploadSerializer.MODE_UPSERT],
+        default=FileUploadSerializer.MODE_INSERT
+    )
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'file_name', 'size', 'offset', 'mode', 'all_sheets', 'sha256', 'status', 'job']
+        read_only_fields = ['offset', 'sha256', 'status', 'job']
+
+    def validate_file_name(self, value):
+        if not value.endswith(FileUploadSerializer.FILE_EXTENSIONS):
+            raise serializers.ValidationError(FileUploadSerializer.FORMAT_ERROR)
+        return value
+
+    def validate_size(self, value):
+        if value == 0:
+            raise serializers.ValidationError("The file is empty.")
+        max_size = settings.IMPORT_MAX_UPLOAD_SIZE
+        if value > max_size:
             raise serializers.ValidationError(
-                "File size too large. Maximum file size is 10MB."
+                f"File size too large. Maximum file size is {max_size // (1024 * 1024)}MB."
             )
-            
-        return value
\ No newline at end of file
+        return value
+
+
+class EmployeeBulkSerializer(FileUploadSerializer):
+    """Import employee records streamed as JSON, committing them in batches.
+
+    Records have the import columns as keys and are validated, deduplicated
+    and loaded like the rows of an upload. Every ``batch_size`` records are
+    committed on their own, so the body never has to fit in memory or in one
+    transaction. Pass the records to ``save(records=...)``.
+    """
+    file = None
+    files = None
+    all_sheets = None
+    batch_size = serializers.IntegerField(
+        min_value=1,
+        max_value=100000,
+        required=False,
+        help_text="records committed together (default BULK_BATCH_SIZE)"
+    )
+
+    def validate(self, attrs):
+        return attrs
+
+    def create(self, validated_data):
+        mode = validated_data.get('mode', self.MODE_INSERT)
+        batch_size = validated_data.get('batch_size') or settings.BULK_BATCH_SIZE
+        profile = ImportProfile()
+        report = ImportReport(self.REQUIRED_COLUMNS, self.context.get('request'))
+        statistics = dict.fromkeys(['records_read', 'companies_created', 'employees_created'], 0)
+        if mode == self.MODE_UPSERT:
+            statistics.update(employees_updated=0, employees_unchanged=0)
+        company_ids = {}
+        changed_companies = set()
+        loader = get_employee_loader(profile)
+        error = None
+
+        with profile, report:
+            frames = record_frames(validated_data['records'], self.REQUIRED_COLUMNS, batch_size)
+            try:
+                for df, record_errors in frames:
+                    report.add(ERROR, record_errors)
+                    statistics['records_read'] += len(df) + len(record_errors)
+                    with transaction.atomic():
+                        self._load_batch(
+                            df, mode, loader, profile, company_ids, changed_companies, report, statistics
+                        )
+            except RecordError as e:
+                # The batches before the error stay committed
+                error = str(e)
+            if not statistics['records_read'] and error is None:
+                error = "The body contains no records"
+
+            if changed_companies:
+                names = {pk: name for name, pk in company_ids.items()}
+                with transaction.atomic(), profile.stage('hierarchy'):
+                    warnings = rebuild_hierarchy({pk: names[pk] for pk in changed_companies})
+                    transaction.on_commit(lambda: bump_data_version('employees'))
+                report.add(WARNING, self._warnings(warnings))
+
+        result = self._prepare_response(statistics, report)
+        result['message'] = 'Records imported'
+        if error:
+            result['error'] = error
+        return result
+
+    def _load_batch(self, df, mode, loader, profile, company_ids, changed_companies, report, statistics):
+        """Validate and load one batch of records in the current transaction."""
+        with profile.stage('process_data'):
+            unique_companies, employees_list, errors, duplicates = self._process_data(df)
+        report.add(ERROR, errors)
+
+        companies_created = 0
+        new_companies = unique_companies - company_ids.keys()
+        if new_companies:
+            with profile.stage('save_companies'):
+                resolved, companies_created = resolve_companies(sorted(new_companies))
+            company_ids.update(resolved)
+
+        load_errors = []
+        created, updated, unchanged = self._save_employees(
+            loader, mode, employees_list, company_ids, load_errors, duplicates, changed_companies
+        )
+        report.add(ERROR, load_errors)
+        report.add(DUPLICATE, duplicates)
+
+        batch = {
+            'companies_created': companies_created,
+            'employees_created': created,
+            'employees_updated': updated,
+            'employees_unchanged': unchanged,
+        }
+        for name in statistics.keys() & batch.keys():
+            statistics[name] += batch[name]
+        changed = {table for name, table in self.CHANGE_STATISTICS.items() if batch[name]}
+        if changed:
+            transaction.on_commit(lambda: bump_data_version(*changed))
+
+
+def _parse_file(path, name, sheet, labelled, chunks):
+    """Parse one CSV file or sheet in a worker process, handing each chunk over on the ``chunks`` queue.
+
+    The queue is bounded, so the worker waits while the importing process
+    is behind. None marks the end of the source.
+    """
+    try:
+        with open(path, 'rb') as local_file:
+            serializer = FileUploadSerializer()
+            for chunk in serializer._parse_source(File(local_file, name=name), sheet, ImportProfile(), labelled):
+                chunks.put(chunk)
+    finally:
+        chunks.put(None)
+
+
+def _next_chunk(chunks, future):
+    """Return the next chunk a worker put on ``chunks``, or None once the worker is done."""
+    while True:
+        try:
+            return chunks.get(timeout=1)
+        except queue.Empty:
+            if future.done():
+                # A worker that died without its end marker
+                try:
+                    return chunks.get_nowait()
+                except queue.Empty:
+                    future.result()
+                    return None
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .companies import company_ids
+from .ledger import forget_imports
+from .models import Company
+from .versions import bump_data_version
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def clear_company_ids(sender, **kwargs):
+    """Drop cached company ids when a company is renamed, added or deleted.
+
+    The cache is cleared again on commit, in case a lookup cached the old
+    state while the transaction was open.
+    """
+    company_ids.clear()
+    transaction.on_commit(company_ids.clear)
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def bump_version_on_change(sender, signal, **kwargs):
+    """Invalidate cached responses built from companies, and from employees on a delete, once it commits.
+
+    Deleting a company deletes its employees with it. Employees have no
+    receivers of their own, so that cascade stays a single DELETE; imports,
+    bulk imports and the admin bump the employee version once per write.
+    """
+    tables = ('companies', 'employees') if signal is post_delete else ('companies',)
+    transaction.on_commit(lambda: bump_data_version(*tables))
+
+
+@receiver(post_delete, sender=Company)
+def forget_imports_on_delete(sender, using, **kwargs):
+    """Clear the import ledger when a company, and with it its employees, is deleted."""
+    forget_imports(using)
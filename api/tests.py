@@ -1,3 +1,1274 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from rest_framework.exceptions import ValidationError
+from .admin import EstimatedCountPaginator
+from .checks import check_asgi_connections, check_shared_cache
+from .jobs import claim_next_job, requeue_stale_jobs, run_job
+from .loaders import BulkCreateLoader, CopyLoader, employee_hash
+from .metrics import Counter, ImportProfile
+from .models import Company, Employee, ImportJob, ImportLedger, UploadSession
+from .partitions import employee_partitions, partition_employees
+from . import readers
+from .companies import company_ids, resolve_companies
+from .reports import report_path
+from .serializers import FileUploadSerializer
+from .versions import data_version
+from .samples import write_import_file
+from .uploads import append_chunk
 
 # Create your tests here.
+
+class EmployeeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        companies = [Company.objects.create(name=f"Company {number}") for number in range(3)]
+        Employee.objects.bulk_create([
+            Employee(
+                company=companies[number % 3],
+                employee_id=number,
+                first_name=f"First{number}",
+                last_name=f"Last{number}",
+                phone_number=f"555{number}",
+                salary=Decimal('1000.00'),
+                manager_id=1,
+                department_id=number % 4
+            )
+            for number in range(1, 31)
+        ])
+
+    def setUp(self):
+        # Cached responses outlive the rolled back data of other tests
+        cache.clear()
+
+    def test_list_does_not_query_companies_per_row(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/employees/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 30)
+        self.assertEqual(response.json()['results'][0]['company'], "Company 1")
+
+    def test_cursor_pages_cover_every_employee_once(self):
+        seen = []
+        url = '/api/employees/?page_size=7'
+        while url:
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            seen.extend(employee['id'] for employee in page['results'])
+            url = page['next']
+
+        self.assertEqual(seen, sorted(Employee.objects.values_list('id', flat=True)))
+
+    def test_fields_limits_columns_and_output(self):
+        with self.assertNumQueries(1) as context:
+            response = self.client.get('/api/employees/?fields=employee_id,company')
+
+        self.assertEqual(set(response.json()['results'][0]), {'employee_id', 'company'})
+        self.assertNotIn('first_name', context.captured_queries[0]['sql'])
+
+    def test_employees_keep_their_original_fields(self):
+        fields = {
+            'id', 'company', 'employee_id', 'first_name', 'last_name', 'phone_number',
+            'salary', 'manager_id', 'department_id', 'created_at', 'updated_at'
+        }
+        employee = self.client.get('/api/employees/').json()['results'][0]
+
+        self.assertEqual(set(employee), fields)
+        self.assertEqual(set(self.client.get('/api/async/employees/').json()['results'][0]), fields)
+        response = self.client.get('/api/employees/?fields=row_hash,hierarchy_path')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/employees/?fields=employee_id,password')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters_and_ordering(self):
+        response = self.client.get(
+            '/api/employees/?company=Company 1&department_id=1,2&salary_max=1000&ordering=-employee_id'
+        )
+
+        ids = [employee['employee_id'] for employee in response.json()['results']]
+        self.assertEqual(ids, [25, 22, 13, 10, 1])
+
+    def test_invalid_filters_are_rejected(self):
+        for query in ['ordering=password', 'salary_min=lots', 'department_id=1,x']:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/employees/?{query}').status_code, 400)
+
+    def test_stats_are_grouped_by_company_and_department(self):
+        Employee.objects.filter(employee_id=1).update(salary=Decimal('4000.00'))
+
+        stats = self.client.get('/api/employees/stats/?department_id=1').json()
+
+        self.assertEqual(stats['total']['count'], 8)
+        self.assertEqual(stats['total']['salary_max'], 4000)
+        self.assertEqual(
+            [(company['company_name'], company['count']) for company in stats['companies']],
+            [("Company 0", 2), ("Company 1", 3), ("Company 2", 3)]
+        )
+        self.assertEqual(stats['departments'][0]['salary_sum'], 11000)
+
+    def test_csv_export_streams_filtered_rows_in_chunks(self):
+        with patch('api.exports.ROWS_PER_WRITE', 2):
+            response = self.client.get('/api/employees/export/?format=csv&company=Company 1&department_id=1,2')
+            chunks = list(response.streaming_content)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="employees.csv"')
+        # Five rows and the header, written two rows at a time
+        self.assertEqual(len(chunks), 3)
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[0], [
+            'id', 'company', 'employee_id', 'first_name', 'last_name', 'phone_number',
+            'salary', 'manager_id', 'department_id', 'created_at', 'updated_at'
+        ])
+        self.assertEqual([row[2] for row in rows[1:]], ['1', '10', '13', '22', '25'])
+        self.assertEqual(rows[1][1:9], ["Company 1", '1', "First1", "Last1", "5551", '1000.00', '1', '1'])
+
+    def test_ndjson_export_writes_one_object_per_employee(self):
+        response = self.client.get('/api/employees/export/?format=ndjson&department_id=3')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="employees.ndjson"')
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([record['employee_id'] for record in records], [3, 7, 11, 15, 19, 23, 27])
+        self.assertEqual(records[0]['company'], "Company 0")
+        self.assertEqual(records[0]['salary'], '1000.00')
+
+    def test_xlsx_export_writes_a_worksheet(self):
+        response = self.client.get('/api/employees/export/?format=xlsx&company=Company 2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        self.assertIn('filename="employees.xlsx"', response['Content-Disposition'])
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+        workbook.close()
+        self.assertEqual(rows[0][:3], ('id', 'company', 'employee_id'))
+        self.assertEqual([row[2] for row in rows[1:]], [2, 5, 8, 11, 14, 17, 20, 23, 26, 29])
+        self.assertEqual(rows[1][1:9], ("Company 2", 2, "First2", "Last2", "5552", 1000, 1, 2))
+        # Excel has no time zones, so times are written without one
+        self.assertIsNone(rows[1][9].tzinfo)
+
+    def test_export_rejects_invalid_filters_and_formats(self):
+        self.assertEqual(self.client.get('/api/employees/export/?salary_min=lots').status_code, 400)
+        self.assertEqual(self.client.get('/api/employees/export/?format=pdf').status_code, 404)
+
+    def test_etag_changes_when_employees_change(self):
+        etag = self.client.get('/api/employees/stats/')['ETag']
+        response = self.client.get('/api/employees/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Deleting a company deletes its employees in one statement, and
+        # queues a single version bump
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, \
+                CaptureQueriesContext(connection) as queries:
+            Company.objects.get(name="Company 1").delete()
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT "api_employee"')])
+        response = self.client.get('/api/employees/stats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    async def test_async_list_pages_match_the_list(self):
+        seen = []
+        url = '/api/async/employees/?page_size=7&count=1&fields=id,company'
+        while url:
+            page = (await self.async_client.get(url)).json()
+            self.assertEqual(page['count'], 30)
+            seen.extend(employee['id'] for employee in page['results'])
+            url = page['next']
+
+        expected = [employee.id async for employee in Employee.objects.order_by('id')]
+        self.assertEqual(seen, expected)
+        self.assertEqual(page['results'][-1]['company'], "Company 0")
+        response = await self.async_client.get('/api/async/employees/?after=x')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_lists_are_served_from_the_cache(self):
+        companies = self.client.get('/api/companies/')
+        employees = self.client.get('/api/employees/?page_size=5')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/employees/?page_size=5').json(), employees.json())
+            response = self.client.get('/api/companies/', HTTP_IF_NONE_MATCH=companies['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+        # An import for known companies leaves the company list cached
+        content = ','.join(FileUploadSerializer.REQUIRED_COLUMNS) + "\nCompany 1,Ann,Lee,555,100,1,1,1000\n"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/upload/', {'file': SimpleUploadedFile('employees.csv', content.encode())})
+        response = self.client.get('/api/companies/', HTTP_IF_NONE_MATCH=companies['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/employees/?page_size=5', HTTP_IF_NONE_MATCH=employees['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+
+class FileUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def _report(self, result):
+        response = self.client.get(result['report']['url'])
+        self.assertEqual(response.status_code, 200)
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def _upload(self, url, rows, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            summary = write_import_file(path, rows, 5, **options)
+            with open(path, 'rb') as file:
+                return self.client.post(url, {'file': file}), summary
+
+    def test_generated_errors_and_duplicates_are_reported(self):
+        response, summary = self._upload('/api/upload/', 500, error_rate=0.1, duplicate_rate=0.1, seed=1)
+
+        self.assertEqual(response.status_code, 201)
+        result = response.json()
+        self.assertEqual(result['report']['errors'], summary['errors'])
+        self.assertEqual(result['report']['duplicates'], summary['duplicates'])
+        self.assertEqual(
+            result['statistics']['employees_created'],
+            summary['rows'] - summary['errors'] - summary['duplicates']
+        )
+
+        # The response only samples what the report lists in full
+        self.assertEqual(len(result['errors']), 20)
+        self.assertNotIn('values', result['errors'][0])
+        report = self._report(result)
+        self.assertEqual(len(report), summary['errors'] + summary['duplicates'])
+        errors = [line for line in report if line['kind'] == 'error']
+        self.assertEqual(
+            [int(line['row']) for line in errors[:20]],
+            [error['row'] for error in result['errors']]
+        )
+        self.assertTrue(all(line['reason'] and line['EMPLOYEE_ID'] for line in report))
+
+    def test_clean_imports_have_no_report(self):
+        response, _ = self._upload('/api/upload/', 50)
+        self.assertNotIn('report', response.json())
+
+    def test_profile_is_only_returned_when_asked_for(self):
+        response, _ = self._upload('/api/upload/', 50)
+        self.assertNotIn('profile', response.json())
+
+        response, _ = self._upload('/api/upload/?profile=1', 50, seed=2)
+        profile = response.json()['profile']
+        self.assertEqual(profile['rows']['read'], 50)
+        self.assertGreater(profile['queries'], 0)
+        self.assertIn('bulk_load', profile['stages'])
+
+        metrics = self.client.get('/metrics').content.decode()
+        self.assertIn('employee_import_stage_seconds_total{stage="bulk_load"}', metrics)
+
+    def test_repeated_uploads_are_answered_from_the_ledger(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            write_import_file(path, 100, 5, duplicate_rate=0.1, seed=3)
+
+            def upload(url):
+                with open(path, 'rb') as file:
+                    return self.client.post(url, {'file': file})
+
+            first = upload('/api/upload/')
+            with CaptureQueriesContext(connection) as queries:
+                repeated = upload('/api/upload/')
+            forced = upload('/api/upload/?force=1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(repeated.status_code, 200)
+        self.assertTrue(repeated.json()['ledger']['replayed'])
+        self.assertEqual(repeated.json()['statistics'], first.json()['statistics'])
+        self.assertFalse([query for query in queries if 'api_employee' in query['sql']])
+
+        # Forced, the file is imported again and every row is now stored
+        self.assertEqual(forced.status_code, 201)
+        self.assertEqual(forced.json()['statistics']['employees_created'], 0)
+        self.assertEqual(ImportLedger.objects.get().result['statistics']['employees_created'], 0)
+
+    def test_uploads_are_imported_again_once_their_employees_are_deleted(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            write_import_file(path, 40, 2, seed=3)
+
+            def upload():
+                with open(path, 'rb') as file:
+                    return self.client.post('/api/upload/', {'file': file})
+
+            first = upload()
+            self.client.post('/admin/api/employee/', {
+                'action': 'delete_selected',
+                '_selected_action': list(Employee.objects.values_list('pk', flat=True)[:5]),
+                'post': 'yes',
+            })
+            after_employee_delete = upload()
+            self.client.post('/admin/api/company/', {
+                'action': 'delete_employees',
+                '_selected_action': list(Company.objects.values_list('pk', flat=True)),
+            })
+            after_action = upload()
+            Company.objects.all().delete()
+            after_company_delete = upload()
+
+        self.assertEqual(first.json()['statistics']['employees_created'], 40)
+        for response, created in ((after_employee_delete, 5), (after_action, 40), (after_company_delete, 40)):
+            self.assertEqual(response.status_code, 201)
+            self.assertNotIn('ledger', response.json())
+            self.assertEqual(response.json()['statistics']['employees_created'], created)
+
+    def _sheet(self, rows):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'employees.xlsx')
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(path)
+        return path
+
+    def _upload_sheet(self, rows):
+        with open(self._sheet(rows), 'rb') as file:
+            return self.client.post('/api/upload/', {'file': file})
+
+    def test_repeated_xlsx_headers_are_renamed_like_pandas(self):
+        header = FileUploadSerializer.REQUIRED_COLUMNS + ['SALARY', 'SALARY.1', None, 'SALARY']
+        row = ["Acme", "Ada", "Lovelace", "555", 1, 1, 7, 100, 200, 300, 400, 500]
+        path = self._sheet([header, row])
+        for engine in readers.XLSX_ENGINES:
+            with self.subTest(engine=engine), open(path, 'rb') as file:
+                columns = next(readers.read_chunks(file, 10, xlsx_engine=engine)).columns
+                self.assertEqual(list(columns), list(pd.read_excel(path).columns))
+
+        response = self._upload_sheet([header, row])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Employee.objects.get().salary, 100)
+
+    def test_rows_above_the_xlsx_header_count_in_row_numbers(self):
+        valid = ["Acme", "Ada", "Lovelace", "555", 1, 1, 7, 100]
+        invalid = ["Acme", "Ada", "Lovelace", "555", "x", 1, 7, 100]
+        rows = [[], [], FileUploadSerializer.REQUIRED_COLUMNS, valid, invalid]
+        response = self._upload_sheet(rows)
+
+        self.assertEqual(response.status_code, 201)
+        # The invalid record is on row 5 of the sheet
+        self.assertEqual([error['row'] for error in response.json()['errors']], [5])
+
+    def test_unreadable_files_are_rejected_with_400(self):
+        response = self._upload_sheet([['NAME'], ['Acme']])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('columns', response.json()['validation_error'])
+
+    def test_running_jobs_without_a_heartbeat_are_queued_again(self):
+        for seed in (6, 7):
+            self.assertEqual(self._upload('/api/upload/?async=1', 20, seed=seed)[0].status_code, 202)
+        stalled, running = claim_next_job(), claim_next_job()
+        ImportJob.objects.filter(pk=stalled.pk).update(
+            heartbeat_at=timezone.now() - timedelta(minutes=10), rows_read=10
+        )
+
+        self.assertEqual(requeue_stale_jobs(300), 1)
+
+        stalled.refresh_from_db()
+        self.assertEqual((stalled.status, stalled.rows_read), ('pending', 0))
+        self.assertEqual(ImportJob.objects.get(pk=running.pk).status, 'running')
+        job = run_job(claim_next_job())
+        self.assertEqual((job.pk, job.status), (stalled.pk, 'completed'))
+        self.assertGreater(ImportJob.objects.get(pk=job.pk).heartbeat_at, stalled.heartbeat_at)
+
+    def test_upsert_compares_stored_values_changed_outside_imports(self):
+        content = (
+            ','.join(FileUploadSerializer.REQUIRED_COLUMNS) + "\n"
+            "Acme,Ann,Lee,555,1,1,1,200\nAcme,Bob,Ray,556,2,1,1,300\n"
+        ).encode()
+        self.client.post('/api/upload/', {'file': SimpleUploadedFile('employees.csv', content)})
+        employee = Employee.objects.get(employee_id=1)
+        employee.salary = Decimal('999.00')
+        employee.save()
+
+        response = self.client.post(
+            '/api/upload/', {'file': SimpleUploadedFile('employees.csv', content), 'mode': 'upsert'}
+        )
+
+        statistics = response.json()['statistics']
+        self.assertEqual((statistics['employees_updated'], statistics['employees_unchanged']), (1, 1))
+        self.assertEqual(Employee.objects.get(employee_id=1).salary, Decimal('200.00'))
+
+    def test_failed_loads_are_not_recorded_in_the_ledger(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            write_import_file(path, 50, 5, error_rate=0.1)
+
+            def upload():
+                with open(path, 'rb') as file:
+                    return self.client.post('/api/upload/', {'file': file})
+
+            with patch('api.loaders.BulkCreateLoader.insert', side_effect=OperationalError("deadlock detected")):
+                failed = upload()
+            retried = upload()
+
+        self.assertIn({'error': "Failed to create employees: deadlock detected"}, failed.json()['errors'])
+        self.assertEqual(retried.status_code, 201)
+        self.assertGreater(retried.json()['statistics']['employees_created'], 0)
+        # Row validation errors do not keep a result out of the ledger
+        self.assertTrue(ImportLedger.objects.get().result['report']['errors'])
+
+    def test_async_upload_imports_or_queues_the_file(self):
+        response, summary = self._upload('/api/async/upload/', 100, error_rate=0.1, seed=4)
+
+        self.assertEqual(response.status_code, 201)
+        result = response.json()
+        self.assertEqual(result['statistics']['employees_created'], summary['rows'] - summary['errors'])
+        self.assertEqual(result['report']['errors'], summary['errors'])
+        self.assertEqual(Employee.objects.count(), summary['rows'] - summary['errors'])
+
+        response, summary = self._upload('/api/async/upload/?async=1', 50, seed=5)
+
+        self.assertEqual(response.status_code, 202)
+        queued = response.json()
+        self.assertEqual(queued['status'], 'pending')
+        job = run_job(claim_next_job())
+        self.assertEqual(job.pk, queued['job_id'])
+        self.assertEqual(job.status, 'completed')
+        status = self.client.get(queued['status_url']).json()
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['result'], job.result)
+        # The queued file repeats employees of the first one
+        self.assertEqual(job.result['statistics']['employees_created'] + job.result['report']['duplicates'], 50)
+
+        self.assertEqual(self.client.post('/api/async/upload/?async=1', {}).status_code, 400)
+
+    @override_settings(IMPORT_PARSE_WORKERS=2)
+    def test_several_files_are_imported_together(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, f"employees_{number}.csv") for number in range(3)]
+            summaries = [write_import_file(path, 100, 5, error_rate=0.1, seed=number)
+                         for number, path in enumerate(paths)]
+            files = [open(path, 'rb') for path in paths]
+            try:
+                response = self.client.post('/api/upload/', {'file': files[0], 'files': files[1:]})
+            finally:
+                for file in files:
+                    file.close()
+
+        result = response.json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(result['report']['errors'], sum(summary['errors'] for summary in summaries))
+        self.assertEqual(self._report(result)[-1]['source'], 'employees_2.csv')
+
+    @override_settings(IMPORT_CHUNK_SIZE=7)
+    def test_parse_workers_hand_over_chunks_in_source_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, f"employees_{number}.csv") for number in range(3)]
+            for number, path in enumerate(paths):
+                write_import_file(path, 30, 3, error_rate=0.1, seed=number)
+            with open(paths[2], 'w') as file:
+                file.write("COMPANY_NAME,FIRST_NAME\nAcme,Ann\n")
+
+            def parse(workers):
+                files = [File(open(path, 'rb'), name=os.path.basename(path)) for path in paths]
+                try:
+                    with override_settings(IMPORT_PARSE_WORKERS=workers):
+                        parsed = FileUploadSerializer()._parse([(file, None) for file in files], ImportProfile())
+                        chunks = []
+                        with self.assertRaisesRegex(ValidationError, "Missing columns"):
+                            for (file, _), chunk in parsed:
+                                chunks.append((file.name, chunk))
+                    return chunks
+                finally:
+                    for file in files:
+                        file.close()
+
+            sequential = parse(1)
+            with patch.object(FileUploadSerializer, 'PARSE_QUEUE_SIZE', 1):
+                parallel = parse(2)
+
+        self.assertEqual(len(parallel), 10)
+        self.assertEqual(parallel, sequential)
+
+class RowValidationTests(TestCase):
+    """Column-wise validation reports the same errors and records as the original row-by-row loop."""
+
+    HEADER = "COMPANY_NAME,FIRST_NAME,LAST_NAME,PHONE_NUMBER,EMPLOYEE_ID,MANAGER_ID,DEPARTMENT_ID,SALARY\n"
+    FILES = {
+        # Every numeric column also holds text, so pandas reads them as strings
+        'bad_values': (
+            "Acme,Ann,Lee,555,1,1,1,1000\n"
+            "  Acme  , Bob ,  Ray ,  556 , 2 , 1 , 2 , 1500.50 \n"
+            ",Cid,Day,557,3,1,1,1000\n"
+            "   ,Dan,Fox,558,4,1,1,1000\n"
+            "Acme,Eve,Gil,559,5,1,1,lots\n"
+            "Acme,Fay,Hal,560,6,1,1,900\n"
+            "Acme,Gus,Ivy,561,6,1,1,950\n"
+            "Acme,Hal,Jon,562,14,1,1,-10\n"
+            "Acme,Ida,Kim,563,15,1,1,0\n"
+            "Acme,Jon,Lim,564,x7,1,1,1000\n"
+            "Acme,Kay,Mo,565,-8,1,1,1000\n"
+            "Acme,Lou,Ng,566,0,1,1,1000\n"
+            "Acme,Max,Oz,567,9.5,1,1,1000\n"
+            "Acme,Ned,Pu,568,10,boss,1,1000\n"
+            "Acme,Oli,Qi,569,11,1,sales,1000\n"
+            "Beta,Pat,Ro,570,1,1,1,1e3\n"
+            "Beta,Ray,Su,571,13,1,1,NaN\n"
+        ),
+        # Numeric columns with gaps are read as floats
+        'missing_values': (
+            "Acme,Ann,Lee,555,1,1,1,1000\n"
+            "Acme,,Ray,,2,1,2,1500\n"
+            "Acme,Cid,Day,557,,1,1,1000\n"
+            "Acme,Dan,Fox,558,4,,1,1000\n"
+            "Acme,Eve,Gil,559,5,1,,1000\n"
+            "Acme,Fay,Hal,560,6,1,1,\n"
+            ",Gus,Ivy,561,7,1,1,1000\n"
+            "Acme,Hal,Jon,562,8,1,1,2000.25\n"
+        ),
+    }
+
+    def _frame(self, name):
+        return pd.read_csv(io.StringIO(self.HEADER + self.FILES[name]))
+
+    def _baseline(self, df):
+        """The row-by-row validation that _process_data replaced."""
+        unique_companies = set()
+        employees_list = []
+        errors = []
+        for index, row in df.iterrows():
+            try:
+                company_name = row['COMPANY_NAME']
+                if not isinstance(company_name, str) or not company_name.strip():
+                    errors.append({"row": index + 2, "error": "Invalid company name"})
+                    continue
+
+                company_name = company_name.strip()
+                unique_companies.add(company_name)
+
+                salary = Decimal(str(row['SALARY']))
+                if salary <= 0:
+                    raise ValueError("Salary must be positive")
+                employee_id = int(row['EMPLOYEE_ID'])
+                if employee_id <= 0:
+                    raise ValueError("Employee ID must be positive")
+                employees_list.append({
+                    'first_name': str(row['FIRST_NAME']).strip(),
+                    'last_name': str(row['LAST_NAME']).strip(),
+                    'phone_number': str(row['PHONE_NUMBER']).strip(),
+                    'employee_id': employee_id,
+                    'manager_id': int(row['MANAGER_ID']),
+                    'department_id': int(row['DEPARTMENT_ID']),
+                    'salary': salary,
+                    'row': index + 2,
+                    'company_name': company_name,
+                })
+            except Exception as e:
+                errors.append({"row": index + 2, "error": str(e)})
+        return unique_companies, employees_list, errors
+
+    def test_errors_and_records_match_the_row_by_row_checks(self):
+        for name in self.FILES:
+            with self.subTest(file=name):
+                df = self._frame(name)
+                companies, employees, errors, duplicates = FileUploadSerializer()._process_data(df)
+
+                expected_companies, expected_employees, expected_errors = self._baseline(df)
+                self.assertEqual(
+                    [{'row': error['row'], 'error': error['error']} for error in errors], expected_errors
+                )
+                self.assertEqual(employees, expected_employees)
+                self.assertEqual(companies, expected_companies)
+                self.assertEqual(duplicates, [])
+                # Salaries keep their exact decimal value
+                self.assertEqual(
+                    [type(employee['salary']) for employee in employees], [Decimal] * len(employees)
+                )
+
+    def test_upload_reports_rows_like_the_row_by_row_checks(self):
+        upload = SimpleUploadedFile(
+            'employees.csv', (self.HEADER + self.FILES['bad_values']).encode(), content_type='text/csv'
+        )
+
+        result = self.client.post('/api/upload/', {'file': upload}).json()
+
+        _, _, expected_errors = self._baseline(self._frame('bad_values'))
+        self.assertEqual(
+            [{'row': error['row'], 'error': error['error']} for error in result['errors']], expected_errors
+        )
+        # The repeated employee 6 of Acme is a duplicate within the file;
+        # employee 1 of Beta is not, as ids are unique per company
+        self.assertEqual(
+            [(duplicate['row'], duplicate['company'], duplicate['employee_id']) for duplicate in result['duplicates']],
+            [(8, "Acme", 6)]
+        )
+        self.assertEqual(result['statistics']['employees_created'], 4)
+        employee = Employee.objects.get(company__name="Acme", employee_id=2)
+        self.assertEqual(
+            (employee.first_name, employee.last_name, employee.phone_number, employee.salary),
+            ("Bob", "Ray", "556", Decimal('1500.50'))
+        )
+
+    def test_infinite_salaries_are_rejected_by_row(self):
+        upload = SimpleUploadedFile(
+            'employees.csv', (self.HEADER + "Acme,Ann,Lee,555,1,1,1,1000\nAcme,Bob,Ray,556,2,1,1,inf\n").encode()
+        )
+
+        response = self.client.post('/api/upload/', {'file': upload})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [(error['row'], error['error']) for error in response.json()['errors']],
+            [(3, "Salary must be a finite number")]
+        )
+        self.assertEqual(response.json()['statistics']['employees_created'], 1)
+
+
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def _put(self, url, content, start, size, **headers):
+        return self.client.put(
+            url, content, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f"bytes {start}-{start + len(content) - 1}/{size}", **headers
+        )
+
+    def test_chunks_resume_from_the_offset_and_finalize_queues_the_import(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            write_import_file(path, 200, 3)
+            with open(path, 'rb') as file:
+                content = file.read()
+
+        session = self.client.post('/api/uploads/', {'file_name': 'employees.csv', 'size': len(content)}).json()
+        url = session['upload_url']
+        first, second = content[:5000], content[5000:]
+
+        self.assertEqual(self._put(url, first, 0, len(content)).json()['offset'], 5000)
+        # A repeated or skipped chunk is refused with the offset to resume from
+        response = self._put(url, first, 0, len(content))
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 5000))
+        response = self._put(url, second, 5000, len(content), HTTP_X_CONTENT_SHA256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).json()['offset'], 5000)
+
+        self._put(url, second, 5000, len(content), HTTP_X_CONTENT_SHA256=hashlib.sha256(second).hexdigest())
+        response = self.client.post(
+            f"{url}finalize/", {'sha256': hashlib.sha256(content).hexdigest()}
+        )
+        self.assertEqual(response.status_code, 202)
+
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result['statistics']['employees_created'], 200)
+
+    def test_chunks_are_written_outside_the_transaction_reserving_them(self):
+        session = self.client.post('/api/uploads/', {'file_name': 'employees.csv', 'size': 10}).json()
+        url = session['upload_url']
+        depth = len(connection.atomic_blocks)
+        written = []
+
+        def append(session, *args):
+            written.append(len(connection.atomic_blocks))
+            return append_chunk(session, *args)
+
+        with patch('api.views.append_chunk', side_effect=append):
+            self.assertEqual(self._put(url, b'12345', 0, 10).json()['offset'], 5)
+        self.assertEqual(written, [depth])
+
+        # A chunk being received keeps out others until it times out
+        UploadSession.objects.filter(pk=session['id']).update(chunk_token=uuid.uuid4(), chunk_started_at=timezone.now())
+        response = self._put(url, b'67890', 5, 10)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 5))
+        UploadSession.objects.filter(pk=session['id']).update(chunk_started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self._put(url, b'67890', 5, 10).json()['offset'], 10)
+        self.assertIsNone(UploadSession.objects.get(pk=session['id']).chunk_token)
+
+    def test_cleanup_deletes_stale_uploads_and_orphaned_parts(self):
+        stale, fresh = (
+            self.client.post('/api/uploads/', {'file_name': 'employees.csv', 'size': 10}).json()
+            for _ in range(2)
+        )
+        for session in (stale, fresh):
+            self._put(session['upload_url'], b'12345', 0, 10)
+        orphan = os.path.join(settings.MEDIA_ROOT, 'uploads', f"{uuid.uuid4()}.part")
+        with open(orphan, 'wb') as file:
+            file.write(b'12345')
+        old = (timezone.now() - timedelta(days=30)).timestamp()
+        os.utime(orphan, (old, old))
+        UploadSession.objects.filter(pk=stale['id']).update(updated_at=timezone.now() - timedelta(days=30))
+
+        call_command('cleanup_uploads', stdout=io.StringIO())
+
+        self.assertEqual(list(UploadSession.objects.values_list('pk', flat=True)), [uuid.UUID(fresh['id'])])
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'uploads')), [f"{fresh['id']}.part"])
+
+
+class ReaderEngineTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def _import(self, path, engine):
+        with override_settings(IMPORT_CHUNK_SIZE=7, IMPORT_XLSX_ENGINE=engine, IMPORT_CSV_ENGINE=engine):
+            with open(path, 'rb') as file, transaction.atomic():
+                result = FileUploadSerializer().create({'file': File(file, name=os.path.basename(path))})
+                transaction.set_rollback(True)
+        # Compare which rows the reports list and why; each has its own URL,
+        # and engines may read blank cells of the listed rows differently
+        with open(report_path(result['report'].pop('url').split('/')[-2]), newline='') as file:
+            result['report']['lines'] = [line[:4] for line in csv.reader(file)]
+        return result
+
+    def _assert_same_imports(self, extension, engines):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"employees.{extension}")
+            write_import_file(path, 50, 3, error_rate=0.2, duplicate_rate=0.1)
+            if extension == 'csv':
+                # A short row, which pyarrow leaves to pandas
+                with open(path, 'a') as file:
+                    file.write("Company 00001,First,Last,555,99,1,1\n")
+            expected, actual = (self._import(path, engine) for engine in engines)
+
+        self.assertEqual(expected, actual)
+        self.assertTrue(expected['errors'])
+
+    @skipUnless(readers.pyarrow, "pyarrow is not installed")
+    def test_pyarrow_reads_csv_like_pandas(self):
+        self._assert_same_imports('csv', ['pandas', 'pyarrow'])
+
+    @skipUnless(readers.pyarrow, "pyarrow is not installed")
+    def test_pyarrow_rejects_a_bad_row_after_the_first_block(self):
+        # pandas must not take over once chunks were yielded, or it would
+        # read records again from a line it cannot locate reliably
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.csv')
+            write_import_file(path, 30000, 3)
+            with open(path, 'a') as file:
+                file.write("Company 00001,First,Last,555,99,1,1\n")
+            self.assertGreater(os.path.getsize(path), 1 << 20)
+            with open(path, 'rb') as file:
+                chunks = readers.read_chunks(file, 10000, csv_engine='pyarrow')
+                self.assertEqual(list(next(chunks).index[[0, -1]]), [0, 9999])
+                with self.assertRaisesRegex(ValueError, "after record 10000"):
+                    list(chunks)
+
+    def test_repeated_csv_headers_are_renamed_by_every_engine(self):
+        content = (
+            "COMPANY_NAME,FIRST_NAME,LAST_NAME,PHONE_NUMBER,EMPLOYEE_ID,MANAGER_ID,DEPARTMENT_ID,SALARY,SALARY,\n"
+            "Acme,Ann,Lee,555,1,1,1,1000,2000,x\n"
+        ).encode()
+        for engine in readers.CSV_ENGINES:
+            if not readers._installed(engine):
+                continue
+            with self.subTest(engine=engine):
+                chunk = next(readers.read_chunks(SimpleUploadedFile('employees.csv', content), 10, csv_engine=engine))
+                self.assertEqual(list(chunk.columns[-3:]), ['SALARY', 'SALARY.1', 'Unnamed: 9'])
+                self.assertEqual(chunk['SALARY'].tolist(), [1000])
+
+                with override_settings(IMPORT_CSV_ENGINE=engine), transaction.atomic():
+                    response = self.client.post('/api/upload/', {'file': SimpleUploadedFile('employees.csv', content)})
+                    transaction.set_rollback(True)
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.json()['statistics']['employees_created'], 1)
+
+    def test_auto_streams_xlsx_with_openpyxl(self):
+        # calamine holds the whole sheet in memory, so it is only used on request
+        self.assertEqual(readers.resolve_engine('auto', readers.XLSX_ENGINES), 'openpyxl')
+
+    @skipUnless(readers.python_calamine, "python-calamine is not installed")
+    def test_calamine_reads_xlsx_like_openpyxl(self):
+        self._assert_same_imports('xlsx', ['openpyxl', 'calamine'])
+
+    @skipUnless(readers.pyarrow, "pyarrow is not installed")
+    def test_parquet_and_arrow_files_import_like_csv(self):
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in ['csv', 'parquet', 'feather']:
+                path = os.path.join(directory, f"employees.{extension}")
+                write_import_file(path, 50, 3, error_rate=0.2, duplicate_rate=0.1)
+                results.append(self._import(path, 'auto'))
+
+        self.assertEqual(results[1:], results[:1] * 2)
+
+    @skipUnless(readers.pyarrow, "pyarrow is not installed")
+    def test_parquet_decimals_are_imported_exactly(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'employees.parquet')
+            write_import_file(path, 20, 2)
+            salaries = readers.pyarrow.parquet.read_table(path, columns=['SALARY']).column(0).to_pylist()
+            with open(path, 'rb') as file:
+                response = self.client.post('/api/upload/', {'file': file})
+
+        self.assertEqual(response.json()['statistics']['employees_created'], 20)
+        self.assertEqual(sorted(Employee.objects.values_list('salary', flat=True)), sorted(salaries))
+
+
+class CleanupReportsTests(TestCase):
+    def test_reports_older_than_the_max_age_are_deleted(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MEDIA_ROOT=directory):
+            ids = [uuid.uuid4() for _ in range(2)]
+            for report_id in ids:
+                os.makedirs(os.path.dirname(report_path(report_id)), exist_ok=True)
+                with open(report_path(report_id), 'w') as file:
+                    file.write('kind,source,row,reason\n')
+            old = (timezone.now() - timedelta(days=2)).timestamp()
+            os.utime(report_path(ids[0]), (old, old))
+
+            call_command('cleanup_reports', max_age=24 * 3600, stdout=io.StringIO())
+
+            self.assertEqual([os.path.exists(report_path(report_id)) for report_id in ids], [False, True])
+
+
+class BenchmarkImportTests(TestCase):
+    def test_counts_every_error_and_duplicate_beyond_the_samples(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MEDIA_ROOT=directory):
+            output = os.path.join(directory, 'benchmark.json')
+            with override_settings(IMPORT_REPORT_SAMPLES=2):
+                call_command(
+                    'benchmark_import', rows=[200], formats=['csv'], error_rate=0.1,
+                    duplicate_rate=0.1, repeat=1, output=output, stdout=io.StringIO()
+                )
+            with open(output) as file:
+                run = json.load(file)['runs'][0]
+            # The imports are rolled back, and so are their reports
+            self.assertFalse(os.listdir(os.path.join(directory, 'reports')))
+
+        self.assertGreater(run['generated']['errors'], 2)
+        self.assertEqual(run['statistics']['errors'], run['generated']['errors'])
+        self.assertEqual(run['statistics']['duplicates'], run['generated']['duplicates'])
+
+
+class ServingCheckTests(TestCase):
+    def test_several_workers_need_a_shared_cache(self):
+        with patch.dict(os.environ, {'SERVER': 'gunicorn', 'WEB_WORKERS': '3'}):
+            self.assertEqual([error.id for error in check_shared_cache()], ['api.E001'])
+            redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+            with override_settings(CACHES=redis):
+                self.assertEqual(check_shared_cache(), [])
+        with patch.dict(os.environ, {'SERVER': 'gunicorn', 'WEB_WORKERS': '1'}):
+            self.assertEqual(check_shared_cache(), [])
+        with patch.dict(os.environ, {'SERVER': 'runserver', 'WEB_WORKERS': '3'}):
+            self.assertEqual(check_shared_cache(), [])
+
+    def test_persistent_connections_are_flagged_under_uvicorn(self):
+        with patch.dict(settings.DATABASES['default'], CONN_MAX_AGE=60):
+            with patch.dict(os.environ, {'SERVER': 'uvicorn'}):
+                self.assertEqual([warning.id for warning in check_asgi_connections()], ['api.W001'])
+            with patch.dict(os.environ, {'SERVER': 'gunicorn'}):
+                self.assertEqual(check_asgi_connections(), [])
+
+    def test_an_import_worker_needs_a_shared_cache(self):
+        with patch.dict(os.environ, {'SERVER': 'gunicorn', 'WEB_WORKERS': '1', 'IMPORT_WORKER': 'true'}):
+            self.assertEqual([error.id for error in check_shared_cache()], ['api.E001'])
+        with self.assertRaisesMessage(CommandError, 'run_import_worker and the server'):
+            call_command('run_import_worker', once=True, stdout=io.StringIO())
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_shared_cache(import_worker=True), [])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_counters_are_summed_over_processes_in_the_shared_cache(self):
+        labels = {'stage': ('read', 'bulk_load')}
+        # Another process holds its own Counter object for the same metric
+        here, elsewhere = (Counter('test_seconds_total', "Test.", labels, scale=1000) for _ in range(2))
+        here.inc(0.25, stage='read')
+        elsewhere.inc(0.5, stage='read')
+
+        self.assertEqual(here.render().splitlines()[2:], [
+            'test_seconds_total{stage="read"} 0.75',
+            'test_seconds_total{stage="bulk_load"} 0.0',
+        ])
+        with self.assertRaises(ValueError):
+            here.inc(stage='unknown')
+
+
+class CompanyResolutionTests(TestCase):
+    def setUp(self):
+        company_ids.clear()
+        self.addCleanup(company_ids.clear)
+
+    def test_committed_names_are_resolved_from_the_cache(self):
+        Company.objects.create(name="Existing")
+        with self.captureOnCommitCallbacks(execute=True):
+            ids, created = resolve_companies(["Existing", "New"])
+        self.assertEqual(created, 1)
+        self.assertEqual(ids, dict(Company.objects.values_list('name', 'id')))
+
+        # Only confirmed by primary key
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_companies(["New", "Existing"]), (ids, 0))
+
+    def test_company_writes_clear_the_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ids, _ = resolve_companies(["Deleted"])
+        Company.objects.get(pk=ids["Deleted"]).delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new_ids, created = resolve_companies(["Deleted"])
+        self.assertEqual(created, 1)
+        self.assertNotEqual(new_ids, ids)
+
+
+    def test_companies_changed_behind_the_cache_are_resolved_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ids, _ = resolve_companies(["Deleted", "Renamed"])
+        Company.objects.filter(pk=ids["Deleted"]).delete()
+        Company.objects.filter(pk=ids["Renamed"]).update(name="Other")
+        # As if another process made the changes without reaching this cache
+        company_ids.set_many(ids)
+
+        new_ids, created = resolve_companies(["Deleted", "Renamed"])
+
+        self.assertEqual(created, 2)
+        self.assertEqual(new_ids, dict(Company.objects.filter(name__in=["Deleted", "Renamed"]).values_list('name', 'id')))
+
+
+class HierarchyTests(TestCase):
+    HEADER = ','.join(FileUploadSerializer.REQUIRED_COLUMNS)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def _upload(self, managers, mode='insert'):
+        lines = [self.HEADER] + [
+            f"Org,First{employee_id},Last{employee_id},555,{employee_id},{manager_id},1,1000"
+            for employee_id, manager_id in managers.items()
+        ]
+        file = SimpleUploadedFile('org.csv', '\n'.join(lines).encode())
+        return self.client.post('/api/upload/', {'file': file, 'mode': mode}).json()
+
+    def _employee_ids(self, url):
+        return [employee['employee_id'] for employee in self.client.get(url).json()['results']]
+
+    def test_reports_and_chain_follow_the_imported_managers(self):
+        result = self._upload({1: 1, 2: 1, 3: 2, 4: 2, 5: 99, 6: 7, 7: 6, 8: 6})
+
+        warnings = {(warning['employee_id'], warning['warning']) for warning in result['warnings']}
+        self.assertEqual(warnings, {
+            (5, "Manager not found"),
+            (6, "Management cycle: 6 > 7 > 6"),
+            (7, "Management cycle: 6 > 7 > 6"),
+        })
+
+        pk = dict(Employee.objects.values_list('employee_id', 'id'))
+        self.assertEqual(self._employee_ids(f'/api/employees/{pk[1]}/reports/'), [2])
+        self.assertEqual(self._employee_ids(f'/api/employees/{pk[1]}/reports/?depth=2'), [2, 3, 4])
+        chain = self.client.get(f'/api/employees/{pk[4]}/chain/').json()
+        self.assertEqual([employee['employee_id'] for employee in chain], [2, 1])
+        self.assertEqual(self.client.get(f'/api/employees/{pk[8]}/chain/').status_code, 409)
+        self.assertEqual(self.client.get(f'/api/employees/{pk[1]}/reports/?depth=0').status_code, 400)
+
+        # Moving a manager moves everyone below them
+        self._upload({2: 5}, mode='upsert')
+        self.assertEqual(self._employee_ids(f'/api/employees/{pk[5]}/reports/?depth=5'), [2, 3, 4])
+        self.assertEqual(Employee.objects.get(employee_id=3).hierarchy_path, '/5/2/3/')
+
+    @override_settings(IMPORT_REPORT_SAMPLES=3)
+    def test_warnings_are_sampled_and_listed_in_the_report(self):
+        result = self._upload({employee_id: 1000 for employee_id in range(1, 11)})
+
+        self.assertEqual(len(result['warnings']), 3)
+        self.assertEqual(result['report']['warnings'], 10)
+        response = self.client.get(result['report']['url'])
+        lines = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(
+            [(line['kind'], line['reason'], line['EMPLOYEE_ID'], line['MANAGER_ID']) for line in lines],
+            [('warning', "Manager not found", str(employee_id), '1000') for employee_id in range(1, 11)]
+        )
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.companies = [Company.objects.create(name=f"Company {number}") for number in range(2)]
+        Employee.objects.bulk_create([
+            Employee(
+                company=cls.companies[number % 2], employee_id=number, first_name=f"First{number}",
+                last_name=f"Last{number}", phone_number='555', salary=Decimal('1000.00'),
+                manager_id=1, department_id=1
+            )
+            for number in range(1, 21)
+        ])
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_employee_changelist_does_not_query_companies_per_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/api/employee/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Company 1")
+        company_queries = [query for query in queries if 'FROM "api_company"' in query['sql']]
+        # Only the company list filter reads companies on their own
+        self.assertEqual(len(company_queries), 1)
+
+    def test_admin_employee_deletes_bump_the_data_version(self):
+        version = data_version('employees')
+        employees = Employee.objects.filter(employee_id__in=[1, 2])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post('/admin/api/employee/', {
+                'action': 'delete_selected',
+                '_selected_action': list(employees.values_list('pk', flat=True)),
+                'post': 'yes',
+            })
+
+        self.assertFalse(employees.exists())
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(data_version('employees'), version)
+
+    def test_delete_employees_of_companies_action(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/admin/api/company/', {
+                'action': 'delete_employees',
+                '_selected_action': [self.companies[0].pk],
+            }, follow=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Deleted 10 employees.")
+        self.assertFalse(Employee.objects.filter(company=self.companies[0]).exists())
+        self.assertEqual(Employee.objects.filter(company=self.companies[1]).count(), 10)
+        # Employees are neither loaded nor deleted one by one
+        employee_queries = [query['sql'] for query in queries if 'api_employee' in query['sql']]
+        self.assertEqual(len([sql for sql in employee_queries if sql.startswith('DELETE')]), 1)
+        self.assertFalse([sql for sql in employee_queries if sql.startswith('SELECT "api_employee"."id"')])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_delete_employees_of_several_companies_in_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/admin/api/company/', {
+                'action': 'delete_employees',
+                '_selected_action': [company.pk for company in self.companies],
+            }, follow=True)
+
+        self.assertContains(response, "Deleted 20 employees.")
+        self.assertFalse(Employee.objects.exists())
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE FROM "api_employee"')]
+        self.assertEqual(len(deletes), 1)
+
+    def test_department_filter_lists_cached_departments(self):
+        Employee.objects.filter(company=self.companies[1]).update(department_id=2)
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get('/admin/api/employee/')
+        self.assertContains(response, '?department_id=2')
+        with CaptureQueriesContext(connection) as repeated:
+            response = self.client.get(f'/admin/api/employee/?company__id__exact={self.companies[0].pk}')
+            self.client.get(f'/admin/api/employee/?company__id__exact={self.companies[0].pk}')
+        self.assertNotContains(response, '?department_id=2')
+
+        distinct = [query for query in first if 'DISTINCT' in query['sql']]
+        self.assertEqual(len(distinct), 1)
+        self.assertIn('LIMIT', distinct[0]['sql'])
+        # Only the first page of the company's departments reads them
+        self.assertEqual(len([query for query in repeated if 'DISTINCT' in query['sql']]), 1)
+
+        response = self.client.get('/admin/api/employee/?department_id=2')
+        self.assertContains(response, "10 employees")
+
+    @skipUnless(connection.vendor == 'postgresql', "reltuples is PostgreSQL statistics")
+    def test_unfiltered_count_is_estimated_on_postgresql(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE api_employee")
+
+        with patch('api.admin.ESTIMATED_COUNT_MIN', 1), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(EstimatedCountPaginator(Employee.objects.order_by('id'), 10).count, 20)
+            self.assertEqual(EstimatedCountPaginator(Employee.objects.filter(department_id=2).order_by('id'), 10).count, 0)
+        self.assertIn('reltuples', queries[0]['sql'])
+        self.assertIn('COUNT(*)', queries[1]['sql'])
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def _records(self, count, start=1):
+        return [
+            {
+                'company_name': "Acme", 'first_name': f"First{number}", 'last_name': f"Last{number}",
+                'phone_number': "555", 'employee_id': number, 'manager_id': 1, 'department_id': 1,
+                'salary': 1234.56,
+            }
+            for number in range(start, start + count)
+        ]
+
+    def _post(self, body, content_type, query=''):
+        return self.client.post(f"/api/employees/bulk/{query}", body, content_type=content_type)
+
+    def _assert_json_array_import(self):
+        records = self._records(7) + [{'company_name': "Acme", 'employee_id': "x"}, 5]
+        records.append(records[0])
+
+        response = self._post(json.dumps(records), 'application/json', '?batch_size=3')
+
+        self.assertEqual(response.status_code, 201)
+        result = response.json()
+        self.assertEqual(result['statistics'], {
+            'records_read': 10, 'companies_created': 1, 'employees_created': 7
+        })
+        self.assertEqual(sorted(error['row'] for error in result['errors']), [8, 9])
+        self.assertEqual([duplicate['row'] for duplicate in result['duplicates']], [10])
+        self.assertEqual(set(Employee.objects.values_list('salary', flat=True)), {Decimal('1234.56')})
+        self.assertEqual(Employee.objects.get(employee_id=3).hierarchy_path, '/1/3/')
+
+    def test_json_array_is_imported_in_batches(self):
+        self._assert_json_array_import()
+
+    def test_json_array_is_imported_without_ijson(self):
+        with patch('api.bulk.ijson', None):
+            self._assert_json_array_import()
+
+    def test_records_before_a_malformed_line_are_committed(self):
+        lines = [json.dumps(record) for record in self._records(5)] + ['{"company_name": ']
+        response = self._post('\n'.join(lines), 'application/x-ndjson', '?batch_size=2&mode=upsert')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("line 6", response.json()['error'])
+        self.assertEqual(response.json()['statistics']['employees_created'], 5)
+        self.assertEqual(Employee.objects.count(), 5)
+
+
+@skipUnless(connection.vendor == 'postgresql', "the COPY engine is PostgreSQL only")
+class EmployeeLoaderTests(TestCase):
+    """The COPY engine writes the same rows and returns the same keys as bulk_create."""
+
+    def _employee(self, company, employee_id, salary='100.00', phone_number="555"):
+        employee = {
+            'company_id': company.pk, 'employee_id': employee_id, 'first_name': "First",
+            'last_name': "Last", 'phone_number': phone_number, 'salary': Decimal(salary),
+            'manager_id': 1, 'department_id': 1,
+        }
+        return dict(employee, row_hash=employee_hash(employee))
+
+    def _load(self, loader):
+        """Run inserts, conflicts, upserts and an update-only upsert; return what the loader did."""
+        with transaction.atomic():
+            company = Company.objects.create(name="Acme")
+            Employee.objects.create(**self._employee(company, 1))
+
+            def keys(result):
+                return sorted(employee_id for _, employee_id in result)
+
+            results = {
+                # 1 is stored already; 3 has an empty phone number
+                'insert': keys(loader.insert([
+                    self._employee(company, 1), self._employee(company, 2),
+                    self._employee(company, 3, phone_number=""),
+                ])),
+                # 2 changed, 3 did not, 4 is new
+                'upsert': [keys(result) for result in loader.upsert([
+                    self._employee(company, 2, salary='200.00'),
+                    self._employee(company, 3, phone_number=""),
+                    self._employee(company, 4),
+                ])],
+                'update_only': [keys(result) for result in loader.upsert([
+                    self._employee(company, 4, salary='300.00', phone_number=""),
+                ])],
+                'rows': list(Employee.objects.order_by('employee_id').values_list(
+                    'employee_id', 'phone_number', 'salary', 'row_hash'
+                )),
+            }
+            transaction.set_rollback(True)
+        return results
+
+    def test_copy_loader_matches_bulk_create(self):
+        expected = self._load(BulkCreateLoader(batch_size=2))
+        actual = self._load(CopyLoader())
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(expected['insert'], [2, 3])
+        self.assertEqual(expected['upsert'], [[4], [2]])
+        self.assertEqual(expected['update_only'], [[], [4]])
+        # Empty strings stay empty strings rather than becoming NULL
+        self.assertEqual([row[1] for row in expected['rows']], ["555", "555", "", ""])
+        self.assertEqual([row[2] for row in expected['rows']], [
+            Decimal('100.00'), Decimal('200.00'), Decimal('100.00'), Decimal('300.00')
+        ])
+
+
+@skipUnless(connection.vendor == 'postgresql', "declarative partitioning is PostgreSQL only")
+class PartitionTests(TestCase):
+    def _import(self, salary, mode='insert'):
+        records = [
+            {
+                'company_name': f"Company {number % 3}", 'first_name': "First", 'last_name': "Last",
+                'phone_number': "555", 'employee_id': number, 'manager_id': 1, 'department_id': 1,
+                'salary': salary,
+            }
+            for number in range(1, 31)
+        ]
+        body = '\n'.join(json.dumps(record) for record in records)
+        with override_settings(EMPLOYEE_LOAD_ENGINE='copy'):
+            response = self.client.post(
+                f"/api/employees/bulk/?mode={mode}", body, content_type='application/x-ndjson'
+            )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['statistics']
+
+    def test_employees_are_moved_into_partitions_and_back(self):
+        self._import(100)
+        ids = set(Employee.objects.values_list('id', flat=True))
+
+        partition_employees(connection, 4)
+
+        self.assertEqual(employee_partitions(connection), 4)
+        self.assertEqual(set(Employee.objects.values_list('id', flat=True)), ids)
+        statistics = self._import(200, mode='upsert')
+        self.assertEqual(statistics['employees_updated'], 30)
+        self.assertEqual(set(Employee.objects.values_list('salary', flat=True)), {Decimal('200.00')})
+        created = Employee.objects.create(
+            company=Company.objects.get(name="Company 0"), employee_id=99, first_name="New",
+            last_name="Last", phone_number="555", salary=1, manager_id=1, department_id=1
+        )
+        self.assertGreater(created.id, max(ids))
+
+        partition_employees(connection, 0)
+
+        self.assertEqual(employee_partitions(connection), 0)
+        self.assertEqual(Employee.objects.count(), 31)
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import ImportJob
+
+# Bytes read from the request and written to disk at a time
+BUFFER_SIZE = 1024 * 1024
+
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+class ChunkError(Exception):
+    """A chunk was rejected and nothing of it was kept."""
+
+
+def part_path(session):
+    """Return where the bytes received for an upload session are stored."""
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', f"{session.id}.part")
+
+
+def chunk_in_progress(session):
+    """Return whether another request is still writing a chunk of an upload.
+
+    A reservation older than UPLOAD_CHUNK_TIMEOUT seconds belongs to a
+    request that died or stalled, and the next chunk may take over.
+    """
+    if session.chunk_token is None:
+        return False
+    return session.chunk_started_at > timezone.now() - timedelta(seconds=settings.UPLOAD_CHUNK_TIMEOUT)
+
+
+def parse_content_range(value, size):
+    """Return the (start, end) byte positions of a ``Content-Range: bytes start-end/total`` header.
+
+    ``end`` is exclusive. Raises ChunkError when the header is missing,
+    malformed or does not fit the declared file ``size``.
+    """
+    match = CONTENT_RANGE.fullmatch(value.strip()) if value else None
+    if match is None:
+        raise ChunkError("Send the chunk position as Content-Range: bytes start-end/total")
+    start, last, total = match.groups()
+    start, end = int(start), int(last) + 1
+    if end <= start or end > size or (total != '*' and int(total) != size):
+        raise ChunkError(f"Content-Range {value} does not fit a file of {size} bytes")
+    return start, end
+
+
+def append_chunk(session, stream, start, end, sha256=None):
+    """Write bytes ``start`` to ``end`` of an upload from ``stream``, BUFFER_SIZE at a time.
+
+    Anything stored past ``start`` by an interrupted request is dropped
+    first. When the body is shorter than the range, or its SHA-256 does not
+    match ``sha256``, the file is cut back to ``start`` and ChunkError is
+    raised. Returns the new offset.
+    """
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    with open(path, 'ab') as file:
+        if file.seek(0, os.SEEK_END) < start:
+            raise ChunkError("The bytes received earlier are missing; start a new upload")
+        file.truncate(start)
+        remaining = end - start
+        while remaining:
+            data = stream.read(min(BUFFER_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            file.write(data)
+            remaining -= len(data)
+
+        error = None
+        if remaining:
+            error = f"The body ended {remaining} bytes before the end of Content-Range"
+        elif sha256 and digest.hexdigest() != sha256.lower():
+            error = "The chunk does not match its SHA-256 checksum"
+        if error:
+            file.truncate(start)
+            raise ChunkError(error)
+    return end
+
+
+def file_sha256(path):
+    """Hash a file on disk without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for data in iter(lambda: file.read(BUFFER_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def queue_upload(session):
+    """Move a complete upload into the import queue and return its ImportJob."""
+    name = os.path.join('imports', f"{session.id}_{os.path.basename(session.file_name)}")
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, 'imports'), exist_ok=True)
+    os.replace(part_path(session), os.path.join(settings.MEDIA_ROOT, name))
+    job = ImportJob(file_name=session.file_name, mode=session.mode, all_sheets=session.all_sheets)
+    job.file.name = name
+    job.save()
+    return job
@@ -0,0 +1,77 @@
+import hashlib
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+# Tables with their own data version; a response depends on one or more
+TABLES = ('companies', 'employees')
+
+
+def _version_key(table):
+    return f'data-version:{table}'
+
+
+def data_version(*tables):
+    """Return a token that changes whenever data of ``tables`` is committed.
+
+    Every table has its own version, so an import that only touches
+    employees leaves responses about companies valid. The versions live in
+    the default cache, which must be shared between processes (e.g. Redis or
+    Memcached) when the API runs in more than one.
+    """
+    tables = tables or TABLES
+    keys = [_version_key(table) for table in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+        # Without a working cache, never let two responses share a version
+        if versions[key] is None:
+            versions[key] = uuid.uuid4().hex
+    return ':'.join(versions[key] for key in keys)
+
+
+def bump_data_version(*tables):
+    """Give ``tables``, or every table, a new version so earlier ETags no longer match.
+
+    Call it from ``transaction.on_commit``, once the change is visible.
+    """
+    cache.set_many({_version_key(table): uuid.uuid4().hex for table in tables or TABLES}, timeout=None)
+
+
+def data_etag(request, tables=TABLES):
+    """Return the ETag of a read-only response built from ``tables``.
+
+    It covers the data versions, the URL with its query string and the
+    format negotiated by REST framework views; plain Django views answer
+    in JSON.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    response_format = renderer.format if renderer else 'json'
+    key = f"{data_version(*tables)}:{request.build_absolute_uri()}:{response_format}"
+    return f'"{hashlib.md5(key.encode()).hexdigest()}"'
+
+
+def cached_payload(etag, build):
+    """Return the response data stored for ``etag``, calling ``build`` on a miss.
+
+    The ETag changes with the data, so a stored payload never goes stale;
+    RESPONSE_CACHE_TIMEOUT only bounds how long unused ones are kept.
+    """
+    key = 'response:' + etag.strip('"')
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+    return data
+
+
+async def acached_payload(etag, build):
+    """Async version of ``cached_payload``, for a ``build`` coroutine function."""
+    key = 'response:' + etag.strip('"')
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, settings.RESPONSE_CACHE_TIMEOUT)
+    return data
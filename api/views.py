@@ -1,17 +1,148 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, status
 from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.parsers import MultiPartParser, FormParser
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import no_body, swagger_auto_schema
 from drf_yasg import openapi
-from .serializers import FileUploadSerializer, CompanySerializer, EmployeeSerializer
-from .models import Company, Employee
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max, Min, Sum
+from django.db.models.functions import Round
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.urls import reverse
+from .serializers import (
+    FileUploadSerializer, CompanySerializer, EmployeeBulkSerializer, EmployeeSerializer, ImportJobSerializer,
+    UploadSessionSerializer
+)
+from .models import Company, Employee, ImportJob, UploadSession
+from .pagination import EmployeeCursorPagination
+from .exports import export_response
+from .renderers import EXPORT_RENDERERS
+from .metrics import render_metrics
+from .filters import (
+    ORDERING_FIELDS, employee_ordering, filter_employees, report_depth, requested_fields, select_fields
+)
+from .hierarchy import HIERARCHY_FIELDS
+from .versions import TABLES, cached_payload, data_etag
+from .bulk import iter_records
+from .jobs import queue_import
+from .ledger import replayed_result
+from .reports import report_path
+from .uploads import (
+    ChunkError, append_chunk, chunk_in_progress, file_sha256, parse_content_range, part_path, queue_upload
+)
+import csv
+import io
+import itertools
 import logging
+import os
+import uuid
 
 logger = logging.getLogger(__name__)
 
 # Create your views here.
 
+def _flag(request, name):
+    """Read a boolean option from the query string or the form data."""
+    value = request.query_params.get(name, request.data.get(name, ''))
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def metrics(request):
+    """Expose the import metrics of every process in the Prometheus text format."""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def _not_modified(request, etag):
+    """Return a 304 response when the client already holds the ``etag`` version."""
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in etags or '*' in etags:
+        return _with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+    return None
+
+def _with_etag(response, etag):
+    """Tag a response so clients revalidate it with If-None-Match."""
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+def _cached_response(request, tables, build):
+    """Answer a read-only request built from ``tables`` without touching the database when possible.
+
+    Clients holding the current ETag get a 304; otherwise the payload is
+    served from the response cache. ``build`` returns the response data and
+    only runs when neither applies.
+    """
+    etag = data_etag(request, tables)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    return _with_etag(Response(cached_payload(etag, build)), etag)
+
+class HierarchyUnknown(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The employee's place in the hierarchy is unknown."
+    default_code = 'hierarchy_unknown'
+
+EMPLOYEE_FILTER_PARAMETERS = [
+    openapi.Parameter(
+        'company',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description='Company name'
+    ),
+    openapi.Parameter(
+        'company_id',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description='Company id, or comma separated ids'
+    ),
+    openapi.Parameter(
+        'department_id',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description='Department id, or comma separated ids'
+    ),
+    openapi.Parameter(
+        'manager_id',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        required=False,
+        description='Manager id, or comma separated ids'
+    ),
+    openapi.Parameter(
+        'salary_min',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_NUMBER,
+        required=False,
+        description='Lowest salary, inclusive'
+    ),
+    openapi.Parameter(
+        'salary_max',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_NUMBER,
+        required=False,
+        description='Highest salary, inclusive'
+    )
+]
+
+EXPORT_PARAMETERS = [
+    openapi.Parameter(
+        'format',
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        enum=['csv', 'ndjson', 'xlsx'],
+        required=False,
+        description='File format (default csv)'
+    )
+]
+
 class FileUploadViewSet(viewsets.ViewSet):
     parser_classes = (MultiPartParser, FormParser)
     serializer_class = FileUploadSerializer
@@ -23,11 +154,58 @@ class FileUploadViewSet(viewsets.ViewSet):
                 'file',
                 openapi.IN_FORM,
                 type=openapi.TYPE_FILE,
-                required=True,
+                required=False,
                 description='Excel or CSV file containing employee and company data'
+            ),
+            openapi.Parameter(
+                'files',
+                openapi.IN_FORM,
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Items(type=openapi.TYPE_FILE),
+                collection_format='multi',
+                required=False,
+                description='More files imported together with file in one transaction'
+            ),
+            openapi.Parameter(
+                'all_sheets',
+                openapi.IN_FORM,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description='Import every sheet of Excel files instead of only the first'
+            ),
+            openapi.Parameter(
+                'mode',
+                openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                enum=['insert', 'upsert'],
+                required=False,
+                description='insert (default) reports stored employees as duplicates; '
+                            'upsert updates the ones whose values changed'
+            ),
+            openapi.Parameter(
+                'async',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description='Queue the import for a background worker and return a job id'
+            ),
+            openapi.Parameter(
+                'profile',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description='Add per-stage timings, query counts and peak memory to the response'
+            ),
+            openapi.Parameter(
+                'force',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description='Import the file even when the same content was imported before'
             )
         ],
         responses={
+            200: "The same file was imported before; its stored result, with ledger set",
             201: openapi.Response(
                 description="Data imported successfully",
                 examples={
@@ -47,6 +225,16 @@ class FileUploadViewSet(viewsets.ViewSet):
                     }
                 }
             ),
+            202: openapi.Response(
+                description="Import queued",
+                examples={
+                    "application/json": {
+                        "job_id": 1,
+                        "status": "pending",
+                        "status_url": "http://localhost:8000/api/imports/1/"
+                    }
+                }
+            ),
             400: openapi.Response(
                 description="Bad Request",
                 examples={
@@ -65,14 +253,31 @@ class FileUploadViewSet(viewsets.ViewSet):
     )
     def create(self, request):
         try:
-            serializer = FileUploadSerializer(data=request.data)
+            serializer = FileUploadSerializer(
+                data=request.data,
+                context={
+                    'profile': _flag(request, 'profile'),
+                    'force': _flag(request, 'force'),
+                    'request': request
+                }
+            )
             if serializer.is_valid():
+                if _flag(request, 'async'):
+                    entry = None if _flag(request, 'force') else serializer.earlier_import(serializer.validated_data)
+                    if entry is not None:
+                        return Response(replayed_result(entry))
+                    return self._queue_import(request, serializer.validated_data)
                 result = serializer.create(serializer.validated_data)
-                return Response(result, status=status.HTTP_201_CREATED)
+                # Nothing is written when the result comes from the ledger
+                replayed = 'ledger' in result
+                return Response(result, status=status.HTTP_200_OK if replayed else status.HTTP_201_CREATED)
             return Response(
                 {"validation_error": serializer.errors}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except ValidationError as e:
+            # Raised while reading the file, e.g. for missing columns
+            return Response({"validation_error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Unexpected error in file upload: {e}")
             return Response(
@@ -80,9 +285,264 @@ class FileUploadViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _queue_import(self, request, validated_data):
+        """Store the upload under MEDIA_ROOT and queue it for run_import_worker."""
+        job = queue_import(validated_data, force=_flag(request, 'force'))
+        return Response(
+            {
+                "job_id": job.id,
+                "status": job.status,
+                "status_url": request.build_absolute_uri(reverse('imports-detail', args=[job.id]))
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
     def get_serializer_class(self):
         return self.serializer_class
 
+class ResumableUploadViewSet(viewsets.ViewSet):
+    """Upload a large file in byte ranges that can be resumed after a failure.
+
+    Start a session with the file name and size, PUT the file in chunks in
+    order, and finalize the session to queue the import for
+    run_import_worker.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    lookup_value_regex = '[0-9a-f-]{36}'
+
+    @swagger_auto_schema(
+        operation_description="Start a resumable upload of a large Excel or CSV file",
+        request_body=UploadSessionSerializer,
+        responses={
+            201: openapi.Response(
+                description="Upload started",
+                examples={
+                    "application/json": {
+                        "id": "5b9d3c8e-1f0a-4a36-9a4e-2f5d2c6b7e10",
+                        "file_name": "employees.csv",
+                        "size": 734003200,
+                        "offset": 0,
+                        "mode": "insert",
+                        "all_sheets": False,
+                        "sha256": "",
+                        "status": "open",
+                        "job": None,
+                        "upload_url": "http://localhost:8000/api/uploads/5b9d3c8e-1f0a-4a36-9a4e-2f5d2c6b7e10/"
+                    }
+                }
+            ),
+            400: "Bad Request"
+        }
+    )
+    def create(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response({"validation_error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        session = serializer.save()
+        return self._session_response(request, session, status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        operation_description="Get the bytes received so far; resume the upload from offset",
+        responses={200: UploadSessionSerializer, 404: "Not Found"}
+    )
+    def retrieve(self, request, pk=None):
+        session = get_object_or_404(self.queryset, pk=pk)
+        return self._session_response(request, session)
+
+    @swagger_auto_schema(
+        operation_description="Append the next chunk of the file. Send the raw bytes as the body, "
+                              "their position in Content-Range: bytes start-end/total, and "
+                              "optionally their SHA-256 in X-Content-SHA256. start must equal "
+                              "the offset of the upload.",
+        request_body=no_body,
+        manual_parameters=[
+            openapi.Parameter(
+                'Content-Range',
+                openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=True,
+                description='e.g. bytes 0-8388607/734003200'
+            ),
+            openapi.Parameter(
+                'X-Content-SHA256',
+                openapi.IN_HEADER,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Hex SHA-256 of the chunk; a mismatch rejects the chunk'
+            )
+        ],
+        responses={
+            200: UploadSessionSerializer,
+            400: "Bad chunk; nothing of it was kept",
+            404: "Not Found",
+            409: "The chunk does not start at the offset, or the upload is finalized"
+        }
+    )
+    def update(self, request, pk=None):
+        # The row lock is only held to check the chunk and reserve the upload
+        # for it; the body is streamed to disk outside the transaction
+        token = uuid.uuid4()
+        with transaction.atomic():
+            session = get_object_or_404(self.queryset.select_for_update(), pk=pk)
+            if session.status != UploadSession.Status.OPEN:
+                return Response(
+                    {"error": "The upload is finalized", "offset": session.offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if chunk_in_progress(session):
+                return Response(
+                    {"error": "Another chunk of the upload is being received", "offset": session.offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+            try:
+                start, end = parse_content_range(request.headers.get('Content-Range'), session.size)
+            except ChunkError as e:
+                return Response({"error": str(e), "offset": session.offset}, status=status.HTTP_400_BAD_REQUEST)
+            if start != session.offset:
+                return Response(
+                    {"error": f"Expected a chunk starting at byte {session.offset}", "offset": session.offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+            session.chunk_token = token
+            session.chunk_started_at = timezone.now()
+            session.save(update_fields=['chunk_token', 'chunk_started_at', 'updated_at'])
+
+        # Give the connection back, e.g. to the pool, while the client sends
+        if not connection.in_atomic_block:
+            connection.close()
+        error = None
+        try:
+            offset = append_chunk(session, request.stream, start, end, request.headers.get('X-Content-SHA256'))
+        except ChunkError as e:
+            error, offset = e, start
+
+        # Only the request holding the reservation moves the offset
+        released = UploadSession.objects.filter(pk=session.pk, chunk_token=token).update(
+            offset=offset, chunk_token=None, chunk_started_at=None, updated_at=timezone.now()
+        )
+        session = get_object_or_404(self.queryset, pk=pk)
+        if not released:
+            return Response(
+                {"error": "The chunk took too long and another one was received", "offset": session.offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        if error:
+            return Response({"error": str(error), "offset": session.offset}, status=status.HTTP_400_BAD_REQUEST)
+        return self._session_response(request, session)
+
+    @swagger_auto_schema(
+        operation_description="Check the complete file and queue it for import",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'sha256': openapi.Schema(
+                    type=openapi.TYPE_STRING,
+                    description='Hex SHA-256 of the whole file; the import is refused on a mismatch'
+                )
+            }
+        ),
+        responses={
+            202: UploadSessionSerializer,
+            400: "The file does not match its checksum",
+            404: "Not Found",
+            409: "Bytes are missing"
+        }
+    )
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        with transaction.atomic():
+            session = get_object_or_404(self.queryset.select_for_update(), pk=pk)
+            if session.status == UploadSession.Status.FINALIZED:
+                return self._session_response(request, session, status.HTTP_202_ACCEPTED)
+            if session.offset != session.size:
+                return Response(
+                    {"error": f"Received {session.offset} of {session.size} bytes", "offset": session.offset},
+                    status=status.HTTP_409_CONFLICT
+                )
+
+            sha256 = file_sha256(part_path(session))
+            expected = str(request.data.get('sha256', '')).lower()
+            if expected and expected != sha256:
+                return Response(
+                    {"error": "The file does not match its SHA-256 checksum", "sha256": sha256},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            session.job = queue_upload(session)
+            session.sha256 = sha256
+            session.status = UploadSession.Status.FINALIZED
+            session.save(update_fields=['job', 'sha256', 'status', 'updated_at'])
+        return self._session_response(request, session, status.HTTP_202_ACCEPTED)
+
+    @swagger_auto_schema(
+        operation_description="Abandon an upload and delete the bytes received",
+        responses={204: "Deleted", 404: "Not Found"}
+    )
+    def destroy(self, request, pk=None):
+        session = get_object_or_404(self.queryset, pk=pk)
+        if session.status == UploadSession.Status.OPEN and os.path.exists(part_path(session)):
+            os.remove(part_path(session))
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _session_response(self, request, session, status_code=status.HTTP_200_OK):
+        data = self.serializer_class(session).data
+        if session.status == UploadSession.Status.OPEN:
+            data['upload_url'] = request.build_absolute_uri(reverse('uploads-detail', args=[session.id]))
+        elif session.job_id is not None:
+            data['status_url'] = request.build_absolute_uri(reverse('imports-detail', args=[session.job_id]))
+        return Response(data, status=status_code)
+
+class ImportJobViewSet(viewsets.ViewSet):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+
+    @swagger_auto_schema(
+        operation_description="Get the progress and result of a background import",
+        responses={
+            200: openapi.Response(
+                description="Success",
+                schema=ImportJobSerializer
+            ),
+            404: "Not Found"
+        }
+    )
+    def retrieve(self, request, pk=None):
+        job = get_object_or_404(self.queryset, pk=pk)
+        serializer = self.serializer_class(job)
+        return Response(serializer.data)
+
+class ImportReportViewSet(viewsets.ViewSet):
+    renderer_classes = EXPORT_RENDERERS
+    lookup_value_regex = r'[0-9a-f-]{36}'
+
+    @swagger_auto_schema(
+        operation_description="Download the rows an import rejected as errors or duplicates, and "
+                              "its hierarchy warnings, with the reason and the values of each row",
+        manual_parameters=EXPORT_PARAMETERS,
+        responses={200: "File download", 404: "Not Found"}
+    )
+    def retrieve(self, request, pk=None):
+        path = report_path(pk)
+        if not os.path.exists(path):
+            raise Http404("No such report")
+
+        export_format = request.accepted_renderer.format
+        if export_format == 'csv':
+            # Reports are stored as CSV already
+            return FileResponse(
+                open(path, 'rb'), as_attachment=True, filename=f"import_report_{pk}.csv",
+                content_type='text/csv'
+            )
+
+        def rows():
+            with open(path, newline='', encoding='utf-8') as file:
+                yield from itertools.islice(csv.reader(file), 1, None)
+
+        with open(path, newline='', encoding='utf-8') as file:
+            header = next(csv.reader(file))
+        return export_response(export_format, f"import_report_{pk}", header, rows())
+
 class CompanyViewSet(viewsets.ViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
@@ -94,31 +554,309 @@ class CompanyViewSet(viewsets.ViewSet):
                 description="Success",
                 schema=CompanySerializer(many=True)
             ),
+            304: "Not Modified",
             400: "Bad Request",
             500: "Internal Server Error"
         }
     )
     def list(self, request):
-        companies = self.queryset.all()
-        serializer = self.serializer_class(companies, many=True)
-        return Response(serializer.data)
+        def build():
+            companies = self.queryset.all()
+            return self.serializer_class(companies, many=True).data
+
+        return _cached_response(request, ['companies'], build)
+
+    @swagger_auto_schema(
+        operation_description="Download all companies as CSV, NDJSON or XLSX",
+        manual_parameters=EXPORT_PARAMETERS,
+        responses={200: "File download"}
+    )
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        header = ['id', 'name', 'created_at', 'updated_at']
+        rows = self.queryset.order_by('id').values_list(*header).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        return export_response(request.accepted_renderer.format, 'companies', header, rows)
 
 class EmployeeViewSet(viewsets.ViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
+    pagination_class = EmployeeCursorPagination
 
     @swagger_auto_schema(
-        operation_description="Get list of all employees",
+        operation_description="Get a page of employees, ordered by id unless ordering is given",
+        manual_parameters=EMPLOYEE_FILTER_PARAMETERS + [
+            openapi.Parameter(
+                'ordering',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description=f"Field to order by, '-' in front for descending: {', '.join(ORDERING_FIELDS)}"
+            ),
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Comma separated fields to return, e.g. id,first_name,company'
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description='Employees per page (default 100, at most 1000)'
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Cursor from the next or previous link of another page'
+            )
+        ],
         responses={
             200: openapi.Response(
                 description="Success",
                 schema=EmployeeSerializer(many=True)
             ),
+            304: "Not Modified",
             400: "Bad Request", 
             500: "Internal Server Error"
         }
     )
     def list(self, request):
-        employees = self.queryset.all()
-        serializer = self.serializer_class(employees, many=True)
+        fields = requested_fields(request.query_params, self.serializer_class().fields)
+        employees = filter_employees(self.queryset, request.query_params)
+        paginator = self.pagination_class()
+        paginator.ordering = employee_ordering(request.query_params)
+
+        def build():
+            queryset = select_fields(employees, fields)
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            serializer = self.serializer_class(page, many=True, fields=fields)
+            return paginator.get_paginated_response(serializer.data).data
+
+        return _cached_response(request, TABLES, build)
+
+    @swagger_auto_schema(
+        operation_description="Employee count and salary sum, average, minimum and maximum, "
+                              "in total, per company and per department",
+        manual_parameters=EMPLOYEE_FILTER_PARAMETERS,
+        responses={
+            200: openapi.Response(
+                description="Success",
+                examples={
+                    "application/json": {
+                        "total": {
+                            "count": 2, "salary_sum": 3000.0, "salary_avg": 1500.0,
+                            "salary_min": 1000.0, "salary_max": 2000.0
+                        },
+                        "companies": [
+                            {
+                                "company_id": 1, "company_name": "Company Name", "count": 2,
+                                "salary_sum": 3000.0, "salary_avg": 1500.0,
+                                "salary_min": 1000.0, "salary_max": 2000.0
+                            }
+                        ],
+                        "departments": [
+                            {
+                                "department_id": 4, "count": 2, "salary_sum": 3000.0,
+                                "salary_avg": 1500.0, "salary_min": 1000.0, "salary_max": 2000.0
+                            }
+                        ]
+                    }
+                }
+            ),
+            304: "Not Modified",
+            400: "Bad Request"
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        employees = filter_employees(self.queryset, request.query_params)
+
+        def build():
+            # Grouped in the database; only the aggregated rows are fetched
+            salary = {
+                'count': Count('id'),
+                'salary_sum': Sum('salary'),
+                'salary_avg': Round(Avg('salary'), 2),
+                'salary_min': Min('salary'),
+                'salary_max': Max('salary'),
+            }
+            return {
+                'total': employees.aggregate(**salary),
+                'companies': list(
+                    employees.values('company_id', company_name=F('company__name'))
+                    .annotate(**salary)
+                    .order_by('company_name')
+                ),
+                'departments': list(
+                    employees.values('department_id')
+                    .annotate(**salary)
+                    .order_by('department_id')
+                ),
+            }
+
+        return _cached_response(request, TABLES, build)
+
+    @swagger_auto_schema(
+        operation_description="Download all employees, or the filtered ones, as CSV, NDJSON or XLSX",
+        manual_parameters=EMPLOYEE_FILTER_PARAMETERS + EXPORT_PARAMETERS,
+        responses={200: "File download"}
+    )
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        header = [
+            'id', 'company', 'employee_id', 'first_name', 'last_name', 'phone_number',
+            'salary', 'manager_id', 'department_id', 'created_at', 'updated_at'
+        ]
+        columns = ['company__name' if name == 'company' else name for name in header]
+        employees = filter_employees(self.queryset, request.query_params)
+        rows = employees.order_by('id').values_list(*columns).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        return export_response(request.accepted_renderer.format, 'employees', header, rows)
+
+    @swagger_auto_schema(
+        operation_description="Import employees sent as a JSON array or as NDJSON "
+                              "(Content-Type: application/x-ndjson), one record per employee with the "
+                              "import columns as keys. The body is parsed as it arrives and committed "
+                              "every batch_size records.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    name: openapi.Schema(type=openapi.TYPE_STRING)
+                    for name in FileUploadSerializer.REQUIRED_COLUMNS
+                }
+            )
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'mode',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=['insert', 'upsert'],
+                required=False,
+                description='insert (default) reports stored employees as duplicates; '
+                            'upsert updates the ones whose values changed'
+            ),
+            openapi.Parameter(
+                'batch_size',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description=f"Records committed together (default {settings.BULK_BATCH_SIZE})"
+            )
+        ],
+        responses={
+            201: "Records imported; same format as file imports, with records_read",
+            400: "Invalid parameters, or a malformed body; the batches before the error are committed"
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        serializer = EmployeeBulkSerializer(data=request.query_params, context={'request': request})
+        if not serializer.is_valid():
+            return Response({"validation_error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Read the body as a stream rather than through request.data, so it
+        # is neither held in memory nor limited by DATA_UPLOAD_MAX_MEMORY_SIZE
+        records = iter_records(request.stream or io.BytesIO(), request.content_type)
+        result = serializer.save(records=records)
+        if 'error' in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        operation_description="Get a page of the employees reporting to an employee, directly "
+                              "or through up to depth levels of managers, in org-chart order",
+        manual_parameters=[
+            openapi.Parameter(
+                'depth',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description='Levels below the employee to include (default 1, direct reports only)'
+            ),
+            openapi.Parameter(
+                'page_size',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                description='Employees per page (default 100, at most 1000)'
+            ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                required=False,
+                description='Cursor from the next or previous link of another page'
+            )
+        ],
+        responses={
+            200: openapi.Response(
+                description="Success",
+                schema=EmployeeSerializer(many=True)
+            ),
+            400: "Bad Request",
+            404: "Not Found",
+            409: "The employee's place in the hierarchy is unknown"
+        }
+    )
+    @action(detail=True, methods=['get'])
+    def reports(self, request, pk=None):
+        employee = self._placed_employee(pk)
+        depth = report_depth(request.query_params)
+
+        # One range scan of the (company, hierarchy_path) index
+        reports = self.queryset.filter(
+            company_id=employee.company_id,
+            hierarchy_path__startswith=employee.hierarchy_path,
+            hierarchy_depth__gt=employee.hierarchy_depth,
+            hierarchy_depth__lte=employee.hierarchy_depth + depth
+        ).select_related('company')
+        paginator = self.pagination_class()
+        paginator.ordering = ('hierarchy_path', 'id')
+        page = paginator.paginate_queryset(reports, request, view=self)
+        serializer = self.serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Get the managers of an employee, from the direct manager up to "
+                              "the head of the organisation",
+        responses={
+            200: openapi.Response(
+                description="Success",
+                schema=EmployeeSerializer(many=True)
+            ),
+            404: "Not Found",
+            409: "The employee's place in the hierarchy is unknown"
+        }
+    )
+    @action(detail=True, methods=['get'])
+    def chain(self, request, pk=None):
+        employee = self._placed_employee(pk)
+
+        # The path already lists the employee ids of every manager
+        manager_ids = [int(value) for value in employee.hierarchy_path.strip('/').split('/')[:-1]]
+        managers = self.queryset.filter(
+            company_id=employee.company_id,
+            employee_id__in=manager_ids
+        ).select_related('company').order_by('-hierarchy_depth')
+        serializer = self.serializer_class(managers, many=True)
         return Response(serializer.data)
+
+    def _placed_employee(self, pk):
+        """Return employee ``pk``, or raise a 409 when its hierarchy path is unknown."""
+        employee = get_object_or_404(self.queryset.only('company_id', *HIERARCHY_FIELDS), pk=pk)
+        if employee.hierarchy_path is None:
+            raise HierarchyUnknown(
+                "The employee is in or below a management cycle, "
+                "or the hierarchy has not been built yet."
+            )
+        return employee
@@ -81,16 +81,43 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': os.getenv('DB_NAME'),
-        'USER': os.getenv('DB_USER_NAME'),
-        'PASSWORD': os.getenv('DB_PASSWORD'),
-        'HOST': os.getenv('DB_HOST_NAME'),
-        'PORT': os.getenv('DB_PORT')
+# DB_ENGINE=sqlite3 runs against a local SQLite file, e.g. for benchmarks
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME') or BASE_DIR / 'db.sqlite3',
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME'),
+            'USER': os.getenv('DB_USER_NAME'),
+            'PASSWORD': os.getenv('DB_PASSWORD'),
+            'HOST': os.getenv('DB_HOST_NAME'),
+            'PORT': os.getenv('DB_PORT'),
+            # Keep connections open between requests for DB_CONN_MAX_AGE
+            # seconds, checking they still work before reusing them. Not
+            # under uvicorn: ASGI requests run their queries on changing
+            # threads, each of which would keep a connection of its own, so
+            # they are closed after every request unless DB_POOL is set
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0 if os.getenv('SERVER') == 'uvicorn' else 60)),
+            'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
+        }
+    }
+    # DB_POOL=true shares a psycopg connection pool between the threads of a
+    # process instead; it needs psycopg 3 and replaces persistent connections
+    if os.getenv('DB_POOL', 'false').lower() == 'true':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            }
+        }
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -132,6 +159,76 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# File import
+# Uploads are read, validated and inserted IMPORT_CHUNK_SIZE rows at a time,
+# so memory use does not grow with the file size.
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 10000))
+IMPORT_MAX_UPLOAD_SIZE = int(os.getenv('IMPORT_MAX_UPLOAD_SIZE', 500 * 1024 * 1024))
+# Uploads are hashed while they are received, for the import ledger
+FILE_UPLOAD_HANDLERS = [
+    'api.uploadhandlers.HashingMemoryFileUploadHandler',
+    'api.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+# How validated employees are written: 'bulk_create' (any backend) or 'copy'
+# (PostgreSQL COPY through a staging table; falls back to bulk_create elsewhere)
+EMPLOYEE_LOAD_ENGINE = os.getenv('EMPLOYEE_LOAD_ENGINE', 'bulk_create')
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+# Parsers for uploads: 'auto' reads Excel files with openpyxl, which streams
+# them, and CSV files with pyarrow if installed, else pandas. 'calamine' reads
+# Excel files faster but holds the whole sheet in memory.
+IMPORT_XLSX_ENGINE = os.getenv('IMPORT_XLSX_ENGINE', 'auto')
+IMPORT_CSV_ENGINE = os.getenv('IMPORT_CSV_ENGINE', 'auto')
+# Uploads with several files or sheets are parsed by up to this many processes
+IMPORT_PARSE_WORKERS = int(os.getenv('IMPORT_PARSE_WORKERS', os.cpu_count() or 1))
+# Rejected rows are written to a report under MEDIA_ROOT/reports/; import
+# responses only list the first IMPORT_REPORT_SAMPLES errors and duplicates
+IMPORT_REPORT_SAMPLES = int(os.getenv('IMPORT_REPORT_SAMPLES', 20))
+# cleanup_reports deletes reports older than IMPORT_REPORT_MAX_AGE seconds
+IMPORT_REPORT_MAX_AGE = int(os.getenv('IMPORT_REPORT_MAX_AGE', 30 * 24 * 3600))
+# Background import workers update the heartbeat of their running job every
+# IMPORT_JOB_HEARTBEAT_INTERVAL seconds; run_import_worker queues a running
+# job again once its heartbeat is IMPORT_JOB_HEARTBEAT_TIMEOUT seconds old
+IMPORT_JOB_HEARTBEAT_INTERVAL = int(os.getenv('IMPORT_JOB_HEARTBEAT_INTERVAL', 30))
+IMPORT_JOB_HEARTBEAT_TIMEOUT = int(os.getenv('IMPORT_JOB_HEARTBEAT_TIMEOUT', 300))
+# A resumable upload is reserved for the request writing its next chunk for
+# up to UPLOAD_CHUNK_TIMEOUT seconds (gunicorn's WEB_TIMEOUT by default);
+# cleanup_uploads deletes uploads untouched for UPLOAD_MAX_AGE seconds
+UPLOAD_CHUNK_TIMEOUT = int(os.getenv('UPLOAD_CHUNK_TIMEOUT', os.getenv('WEB_TIMEOUT', 300)))
+UPLOAD_MAX_AGE = int(os.getenv('UPLOAD_MAX_AGE', 7 * 24 * 3600))
+# Records of POST /api/employees/bulk/ committed together
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 5000))
+# Hash partitions of the employee table on company, created by migrate on
+# PostgreSQL; 0 keeps one table. Change it later with partition_employees.
+EMPLOYEE_PARTITIONS = int(os.getenv('EMPLOYEE_PARTITIONS', 0))
+
+# Cache holding the data versions behind ETags and the cached list
+# responses. With more than one server process it must be shared, or
+# processes that did not see an import keep answering with the old data;
+# compose.yaml points it at its Redis service:
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://redis:6379/0
+# The process-local default is only for the development server and tests;
+# run_import_worker refuses to start on it.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Seconds an unused list response stays cached; 0 turns the response cache
+# off. Imports and other writes invalidate cached responses right away.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Company name to id lookups of imports are cached in process memory, and
+# also in the Django cache named by COMPANY_CACHE_ALIAS, whose version
+# number tells every process when a company changed. An empty value keeps
+# them per process.
+COMPANY_CACHE_SIZE = int(os.getenv('COMPANY_CACHE_SIZE', 10000))
+COMPANY_CACHE_ALIAS = os.getenv('COMPANY_CACHE_ALIAS', 'default') or None
+
+# Rows fetched per round trip by the streaming export endpoints
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -24,7 +24,11 @@ from django.contrib.staticfiles.urls import static, staticfiles_urlpatterns
 from django.urls import include
 import os
 from dotenv import load_dotenv
-from api.views import FileUploadViewSet, CompanyViewSet, EmployeeViewSet
+from api.views import (
+    FileUploadViewSet, CompanyViewSet, EmployeeViewSet, ImportJobViewSet, ImportReportViewSet,
+    ResumableUploadViewSet, metrics
+)
+from api import async_views
 
 load_dotenv()
 
@@ -43,6 +47,9 @@ router = routers.DefaultRouter()
 router.register(r'upload', FileUploadViewSet, basename='upload')
 router.register(r'companies', CompanyViewSet)
 router.register(r'employees', EmployeeViewSet)
+router.register(r'imports', ImportJobViewSet, basename='imports')
+router.register(r'uploads', ResumableUploadViewSet, basename='uploads')
+router.register(r'reports', ImportReportViewSet, basename='reports')
 re_path(
     r'^swagger(?P<format>\.json|\.yaml)$',
     schema_view.without_ui(cache_timeout=0),
@@ -61,7 +68,11 @@ re_path(
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/async/companies/', async_views.company_list, name='async-companies'),
+    path('api/async/employees/', async_views.employee_list, name='async-employees'),
+    path('api/async/upload/', async_views.upload, name='async-upload'),
     path('api/', include(router.urls)),
+    path('metrics', metrics, name='metrics'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
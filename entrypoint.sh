@@ -28,10 +28,34 @@ done
 
 echo "PostgreSQL is up - continuing"
 
+# Server: SERVER=gunicorn (WSGI) or uvicorn (ASGI) for production,
+# runserver (the default) for development
+export SERVER="${SERVER:-runserver}"
+export WEB_WORKERS="${WEB_WORKERS:-$(( $(nproc) * 2 + 1 ))}"
+
+# Fails when several workers would each keep their own data versions
+echo "Checking configuration"
+python manage.py check
+
 # Apply database migrations
 echo "Applying migrations"
 python manage.py migrate
 
-# Start server
-echo "Starting server"
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+echo "Starting server ($SERVER)"
+case "$SERVER" in
+  gunicorn)
+    exec gunicorn core.wsgi:application --config gunicorn.conf.py
+    ;;
+  uvicorn)
+    exec uvicorn core.asgi:application --host 0.0.0.0 --port 8000 \
+      --workers "${WEB_WORKERS}" \
+      --timeout-keep-alive 5 --no-access-log
+    ;;
+  runserver)
+    exec python manage.py runserver 0.0.0.0:8000
+    ;;
+  *)
+    echo "Unknown SERVER: $SERVER (expected gunicorn, uvicorn or runserver)"
+    exit 1
+    ;;
+esac
@@ -0,0 +1,32 @@
+# Gunicorn settings, read from the working directory when entrypoint.sh
+# starts the API with SERVER=gunicorn. Every value can be set through the
+# environment.
+import multiprocessing
+import os
+
+bind = os.getenv('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Threads per worker; each keeps its own database connection open
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+# Large uploads are imported inside the request
+timeout = int(os.getenv('WEB_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+# Restart workers now and then, so memory freed by big imports goes back
+# to the system
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+def on_starting(server):
+    # Refuse to start several workers on a process-local cache, also when
+    # gunicorn is started without entrypoint.sh
+    os.environ['SERVER'] = 'gunicorn'
+    os.environ['WEB_WORKERS'] = str(server.cfg.workers)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    from django.core.management import call_command
+    django.setup()
+    call_command('check', tags=['caches'])